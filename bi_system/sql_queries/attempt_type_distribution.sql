@@ -1,8 +1,8 @@
 select
-	a.attempt_type as "Тип попытки",
-	count(*) as attempt_type_cnt
-from attempts a
+	t.attempt_type as "Тип попытки",
+	sum(t.attempts_cnt) as attempt_type_cnt
+from daily_attempt_type_stats t
 where true
 	and {{date}}
-group by a.attempt_type
+group by t.attempt_type
 order by attempt_type_cnt desc;
\ No newline at end of file
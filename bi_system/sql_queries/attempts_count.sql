@@ -1,8 +1,7 @@
 select
-	a.created_at::date as dt,
-	count(*) as attempt_cnt
-from attempts a
+	s.dt,
+	s.attempts_cnt as attempt_cnt
+from daily_attempt_stats s
 where true
 	and {{date}}
-group by dt 
-order by dt;
\ No newline at end of file
+order by s.dt;
\ No newline at end of file
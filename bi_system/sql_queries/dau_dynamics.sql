@@ -1,8 +1,7 @@
 select
-	a.created_at::date as dt,
-	count(distinct a.user_id) as dau
-from attempts a
+	s.dt,
+	s.dau
+from daily_attempt_stats s
 where true
 	and {{data}}
-group by dt 
-order by dt;
\ No newline at end of file
+order by s.dt;
\ No newline at end of file
@@ -1,9 +1,8 @@
 select
-	a.created_at::date as "Дата",
-	count(distinct a.user_id) as dau,
-	count(*) as attempt_cnt
-from attempts a
+	s.dt as "Дата",
+	s.dau,
+	s.attempts_cnt as attempt_cnt
+from daily_attempt_stats s
 where true
 	and {{date}}
-group by "Дата"
 order by dau;
\ No newline at end of file
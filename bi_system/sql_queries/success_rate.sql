@@ -1,12 +1,13 @@
 select
-	case 
-		when a.is_correct = True then 'Успешно'
-		when a.is_correct = False then 'Неверно'
-	end as is_success,
-	count(*) as success_cnt
-from attempts a
+	v.is_success,
+	sum(v.success_cnt) as success_cnt
+from daily_attempt_stats s
+cross join lateral (
+	values
+		('Успешно', s.correct_cnt),
+		('Неверно', s.incorrect_cnt)
+) as v(is_success, success_cnt)
 where true
-	and a.is_correct is not null 
 	and {{date}}
-group by is_success
+group by v.is_success
 order by success_cnt desc;
\ No newline at end of file
@@ -1,5 +1,5 @@
 CREATE TABLE IF NOT EXISTS attempts (
-	id SERIAL PRIMARY KEY,
+	id BIGSERIAL,
     user_id VARCHAR(32) NOT NULL,
     oauth_consumer_key TEXT,
     lis_result_sourcedid TEXT,
@@ -7,5 +7,14 @@ CREATE TABLE IF NOT EXISTS attempts (
     is_correct BOOLEAN,
     attempt_type VARCHAR(10) NOT NULL CHECK (attempt_type IN ('run', 'submit')),
     created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (id, created_at),
     CONSTRAINT unique_attempt UNIQUE (user_id, attempt_type, created_at)
-);
\ No newline at end of file
+) PARTITION BY RANGE (created_at);
+
+-- Партиция для записей вне месячных партиций.
+-- Месячные партиции attempts_yYYYYmMM создает ETL (DatabaseInserter.ensure_partitions)
+CREATE TABLE IF NOT EXISTS attempts_default PARTITION OF attempts DEFAULT;
+
+-- Фильтры по дате и подсчет уникальных пользователей по дням (index-only scan)
+CREATE INDEX IF NOT EXISTS attempts_created_at_idx
+    ON attempts (created_at) INCLUDE (user_id, attempt_type, is_correct);
\ No newline at end of file
@@ -0,0 +1,66 @@
+CREATE TABLE IF NOT EXISTS daily_attempt_stats (
+	dt DATE PRIMARY KEY,
+    attempts_cnt INTEGER NOT NULL,
+    dau INTEGER NOT NULL,
+    correct_cnt INTEGER NOT NULL,
+    incorrect_cnt INTEGER NOT NULL,
+    run_cnt INTEGER NOT NULL,
+    submit_cnt INTEGER NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS daily_attempt_type_stats (
+	dt DATE NOT NULL,
+    attempt_type VARCHAR(10) NOT NULL,
+    attempts_cnt INTEGER NOT NULL,
+    users_cnt INTEGER NOT NULL,
+    correct_cnt INTEGER NOT NULL,
+    incorrect_cnt INTEGER NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (dt, attempt_type)
+);
+
+-- Первичное заполнение витрин по уже загруженным попыткам.
+-- Дальше ETL пересчитывает при каждой загрузке только загруженные дни
+INSERT INTO daily_attempt_stats (
+    dt, attempts_cnt, dau, correct_cnt, incorrect_cnt, run_cnt, submit_cnt, updated_at
+)
+SELECT
+    created_at::date AS dt,
+    count(*),
+    count(DISTINCT user_id),
+    count(*) FILTER (WHERE is_correct),
+    count(*) FILTER (WHERE NOT is_correct),
+    count(*) FILTER (WHERE attempt_type = 'run'),
+    count(*) FILTER (WHERE attempt_type = 'submit'),
+    now()
+FROM attempts
+GROUP BY dt
+ON CONFLICT (dt) DO UPDATE SET
+    attempts_cnt = EXCLUDED.attempts_cnt,
+    dau = EXCLUDED.dau,
+    correct_cnt = EXCLUDED.correct_cnt,
+    incorrect_cnt = EXCLUDED.incorrect_cnt,
+    run_cnt = EXCLUDED.run_cnt,
+    submit_cnt = EXCLUDED.submit_cnt,
+    updated_at = EXCLUDED.updated_at;
+
+INSERT INTO daily_attempt_type_stats (
+    dt, attempt_type, attempts_cnt, users_cnt, correct_cnt, incorrect_cnt, updated_at
+)
+SELECT
+    created_at::date AS dt,
+    attempt_type,
+    count(*),
+    count(DISTINCT user_id),
+    count(*) FILTER (WHERE is_correct),
+    count(*) FILTER (WHERE NOT is_correct),
+    now()
+FROM attempts
+GROUP BY dt, attempt_type
+ON CONFLICT (dt, attempt_type) DO UPDATE SET
+    attempts_cnt = EXCLUDED.attempts_cnt,
+    users_cnt = EXCLUDED.users_cnt,
+    correct_cnt = EXCLUDED.correct_cnt,
+    incorrect_cnt = EXCLUDED.incorrect_cnt,
+    updated_at = EXCLUDED.updated_at;
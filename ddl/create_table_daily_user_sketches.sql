@@ -0,0 +1,8 @@
+-- Дневные скетчи HyperLogLog уникальных пользователей (HyperLogLog в etl/components/hyperloglog.py).
+-- Уникальные пользователи за неделю, месяц или любой период считаются объединением скетчей
+CREATE TABLE IF NOT EXISTS daily_user_sketches (
+	dt DATE PRIMARY KEY,
+    precision SMALLINT NOT NULL,
+    registers BYTEA NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
\ No newline at end of file
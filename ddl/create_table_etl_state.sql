@@ -0,0 +1,5 @@
+CREATE TABLE IF NOT EXISTS etl_state (
+	name VARCHAR(64) PRIMARY KEY,
+    watermark TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
\ No newline at end of file
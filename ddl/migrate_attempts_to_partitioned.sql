@@ -0,0 +1,81 @@
+-- Перевод существующей таблицы attempts на партиционирование по месяцам.
+-- Выполняется один раз, во время, когда ETL не запущен.
+BEGIN;
+
+-- Переименовываем старую таблицу вместе с объектами, имена которых нужны новой
+ALTER TABLE attempts RENAME TO attempts_old;
+ALTER TABLE attempts_old RENAME CONSTRAINT unique_attempt TO unique_attempt_old;
+ALTER INDEX attempts_pkey RENAME TO attempts_old_pkey;
+ALTER SEQUENCE attempts_id_seq RENAME TO attempts_old_id_seq;
+
+CREATE TABLE attempts (
+	id BIGSERIAL,
+    user_id VARCHAR(32) NOT NULL,
+    oauth_consumer_key TEXT,
+    lis_result_sourcedid TEXT,
+    lis_outcome_service_url TEXT,
+    is_correct BOOLEAN,
+    attempt_type VARCHAR(10) NOT NULL CHECK (attempt_type IN ('run', 'submit')),
+    created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (id, created_at),
+    CONSTRAINT unique_attempt UNIQUE (user_id, attempt_type, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE attempts_default PARTITION OF attempts DEFAULT;
+
+CREATE INDEX attempts_created_at_idx
+    ON attempts (created_at) INCLUDE (user_id, attempt_type, is_correct);
+
+-- Месячные партиции от первой записи до следующего месяца включительно
+DO $$
+DECLARE
+    month_start DATE;
+BEGIN
+    FOR month_start IN
+        SELECT generate_series(
+            date_trunc('month', first_created_at),
+            date_trunc('month', now()) + interval '1 month',
+            interval '1 month'
+        )::date
+        FROM (SELECT min(created_at) AS first_created_at FROM attempts_old) AS t
+        WHERE first_created_at IS NOT NULL
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF attempts FOR VALUES FROM (%L) TO (%L)',
+            'attempts_y' || to_char(month_start, 'YYYY"m"MM'),
+            month_start,
+            (month_start + interval '1 month')::date
+        );
+    END LOOP;
+END $$;
+
+-- Переносим данные с сохранением id
+INSERT INTO attempts (
+    id,
+    user_id,
+    oauth_consumer_key,
+    lis_result_sourcedid,
+    lis_outcome_service_url,
+    is_correct,
+    attempt_type,
+    created_at
+)
+SELECT
+    id,
+    user_id,
+    oauth_consumer_key,
+    lis_result_sourcedid,
+    lis_outcome_service_url,
+    is_correct,
+    attempt_type,
+    created_at
+FROM attempts_old;
+
+SELECT setval('attempts_id_seq', coalesce((SELECT max(id) FROM attempts), 1));
+
+COMMIT;
+
+ANALYZE attempts;
+
+-- После проверки данных старую таблицу можно удалить:
+-- DROP TABLE attempts_old;
\ No newline at end of file
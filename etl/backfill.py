@@ -0,0 +1,297 @@
+import os
+import argparse
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+from dotenv import load_dotenv, find_dotenv
+from components import DataProcessor, setup_logging
+from main import DATE_FORMAT, get_api_client, get_db_inserter, get_email_notifier
+from main import get_sheets_reporter, get_parquet_archiver, insert_to_db
+from main import get_processed_handler, load_key_index, log_dedup_counts
+
+if TYPE_CHECKING:
+    from components import APIClient, DatabaseInserter, GoogleSheetsReporter
+    from components import ParquetArchiver
+
+setup_logging()
+logger = logging.getLogger("Backfill")
+
+CHECKPOINT_FILE = Path(__file__).parent.parent / "backfill_checkpoint.json"
+
+
+class BackfillCheckpoint:
+    """
+    Файл с прогрессом загрузки истории: для каждого загруженного дня
+    хранится количество записей. Прерванная загрузка продолжается с незагруженных дней.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._lock = threading.Lock()
+        self._days: Dict[str, Dict[str, Any]] = {}
+
+        if path.exists():
+            self._days = json.loads(path.read_text(encoding="utf-8"))
+            logger.info(f"Загружен чекпоинт {path.name}: {len(self._days)} дней.")
+
+    def is_done(self, day: str) -> bool:
+        """Проверяет, загружен ли день."""
+        return day in self._days
+
+    def mark_done(
+        self, day: str, api_records_cnt: int, processed_records_cnt: int
+    ) -> None:
+        """Отмечает день загруженным и сразу сохраняет файл."""
+        with self._lock:
+            self._days[day] = {
+                "api_records_cnt": api_records_cnt,
+                "processed_records_cnt": processed_records_cnt,
+                "loaded_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            # Пишем во временный файл и подменяем, чтобы не испортить чекпоинт
+            tmp_path = self._path.with_suffix(".tmp")
+            tmp_path.write_text(
+                json.dumps(self._days, ensure_ascii=False, indent=2), encoding="utf-8"
+            )
+            os.replace(tmp_path, self._path)
+
+
+def get_days(date_from: date, date_to: date) -> List[str]:
+    """Возвращает список дней периода [date_from, date_to] в формате YYYY-MM-DD."""
+    if date_from > date_to:
+        raise ValueError("Дата начала должна быть не позже даты окончания")
+
+    return [
+        (date_from + timedelta(days=i)).isoformat()
+        for i in range((date_to - date_from).days + 1)
+    ]
+
+
+def backfill_day(
+    day: str,
+    api_client: "APIClient",
+    db_inserter: "DatabaseInserter",
+    sheets_reporter: Optional["GoogleSheetsReporter"],
+    sheets_lock: threading.Lock,
+    archiver: Optional["ParquetArchiver"] = None,
+) -> Dict[str, int]:
+    """
+    Загружает один день: получение и обработка идут параллельно с другими днями,
+    вставка в БД идет в отдельной транзакции на соединении из пула,
+    запись в Google Sheets - по очереди через блокировку, так как клиент общий.
+    С archiver обработанные записи дня добавляются в архив Parquet.
+    Возвращает количество записей из API и обработанных записей.
+    """
+    day_start = datetime.fromisoformat(day)
+    day_end = day_start + timedelta(days=1) - timedelta(microseconds=1)
+
+    attempts_data = api_client.get_attempts_data(
+        client=os.getenv("API_CLIENT"),
+        client_key=os.getenv("API_CLIENT_KEY"),
+        start=day_start.strftime(DATE_FORMAT),
+        end=day_end.strftime(DATE_FORMAT),
+    )
+    api_records_cnt = len(attempts_data)
+    processed_attempts = DataProcessor.processing_attempts(
+        attempts_data, release_raw=True
+    )
+
+    user_sketches = {} if os.getenv("USER_SKETCHES") == "1" else None
+    on_processed = get_processed_handler(user_sketches, archiver)
+    if on_processed:
+        on_processed(processed_attempts)
+
+    with db_inserter.transaction():
+        insert_to_db(db_inserter, processed_attempts, commit=False)
+        db_inserter.refresh_daily_rollups(day_start, day_end, commit=False)
+        if user_sketches is not None:
+            db_inserter.merge_user_sketches(user_sketches, commit=False)
+
+    if sheets_reporter:
+        if os.getenv("STATS_SOURCE") == "db":
+            stats_rows = db_inserter.get_daily_stats(day_start, day_end)
+            with sheets_lock:
+                sheets_reporter.append_daily_stats(stats_rows)
+        else:
+            with sheets_lock:
+                sheets_reporter.append_stats(processed_attempts)
+
+    return {
+        "api_records_cnt": api_records_cnt,
+        "processed_records_cnt": len(processed_attempts),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(
+        description="Загрузка истории попыток за период по дням."
+    )
+    parser.add_argument(
+        "--from",
+        dest="date_from",
+        required=True,
+        type=date.fromisoformat,
+        help="Первый день периода, YYYY-MM-DD",
+    )
+    parser.add_argument(
+        "--to",
+        dest="date_to",
+        required=True,
+        type=date.fromisoformat,
+        help="Последний день периода, YYYY-MM-DD",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Сколько дней загружать одновременно (по умолчанию 4)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=CHECKPOINT_FILE,
+        help="Файл с прогрессом загрузки",
+    )
+    parser.add_argument(
+        "--no-sheets",
+        action="store_true",
+        help="Не отправлять статистику в Google Sheets",
+    )
+    return parser.parse_args()
+
+
+def backfill():
+    """Загрузка истории за период с продолжением после прерывания."""
+    args = parse_args()
+    logger.info(
+        f"Запуск загрузки истории {args.date_from} - {args.date_to}, потоков: {args.workers}."
+    )
+
+    db_inserter = None
+    start_time = datetime.now()
+    done_days, failed_days = [], {}
+    api_records_cnt = processed_records_cnt = 0
+
+    try:
+        load_dotenv(find_dotenv())
+
+        checkpoint = BackfillCheckpoint(args.checkpoint)
+        days = [
+            day
+            for day in get_days(args.date_from, args.date_to)
+            if not checkpoint.is_done(day)
+        ]
+        logger.info(f"Дней к загрузке: {len(days)}.")
+
+        api_client = get_api_client(workers=args.workers)
+        db_inserter = get_db_inserter(workers=args.workers)
+        db_inserter.ensure_partitions(
+            args.date_from.isoformat(), args.date_to.isoformat(), months_ahead=0
+        )
+        # Ключи уже загруженных попыток за дни к загрузке: повторно в БД не передаются
+        key_index = None
+        if days:
+            key_index = load_key_index(
+                db_inserter,
+                datetime.fromisoformat(days[0]),
+                datetime.fromisoformat(days[-1])
+                + timedelta(days=1)
+                - timedelta(microseconds=1),
+            )
+        sheets_reporter = None if args.no_sheets else get_sheets_reporter()
+        sheets_lock = threading.Lock()
+        archiver = get_parquet_archiver()
+
+        def mark_done(day: str, counts: Dict[str, int]) -> None:
+            nonlocal api_records_cnt, processed_records_cnt
+            checkpoint.mark_done(day, **counts)
+            done_days.append(day)
+            api_records_cnt += counts["api_records_cnt"]
+            processed_records_cnt += counts["processed_records_cnt"]
+
+        # Статистика всех дней пишется в Google Sheets одним запросом в конце,
+        # поэтому с Google Sheets дни отмечаются в чекпоинте только после этой записи:
+        # иначе при ее ошибке повторный запуск пропустил бы дни без статистики
+        sheets_batch = sheets_reporter.batch() if sheets_reporter else nullcontext()
+        pending_days: Dict[str, Dict[str, int]] = {}
+        try:
+            with sheets_batch, ThreadPoolExecutor(max_workers=args.workers) as executor:
+                futures = {
+                    executor.submit(
+                        backfill_day,
+                        day,
+                        api_client,
+                        db_inserter,
+                        sheets_reporter,
+                        sheets_lock,
+                        archiver,
+                    ): day
+                    for day in days
+                }
+
+                for future in as_completed(futures):
+                    day = futures[future]
+                    try:
+                        counts = future.result()
+                    except Exception as err:
+                        logger.error(f"Ошибка загрузки дня {day}: {repr(err)}")
+                        failed_days[day] = repr(err)
+                        continue
+
+                    logger.info(f"День {day} загружен в БД: {counts}.")
+                    if sheets_reporter:
+                        pending_days[day] = counts
+                    else:
+                        mark_done(day, counts)
+
+        except Exception as err:
+            # Данные дней уже в БД, но без статистики: при повторном запуске
+            # они загрузятся снова (вставка идемпотентна) и статистика запишется
+            for day in pending_days:
+                failed_days[day] = (
+                    f"Статистика не записана в Google Sheets: {repr(err)}"
+                )
+            raise
+
+        for day in sorted(pending_days):
+            mark_done(day, pending_days[day])
+
+        log_dedup_counts(key_index)
+
+    except Exception as err:
+        logger.error(f"Ошибка при загрузке истории: {repr(err)}")
+        failed_days["*"] = repr(err)
+
+    finally:
+        if db_inserter:
+            try:
+                db_inserter.close_connection()
+            except Exception as err:
+                logger.error(f"Ошибка при закрытии соединения с БД: {repr(err)}")
+
+    logger.info(
+        f"Загрузка истории завершена. Загружено дней: {len(done_days)}, с ошибками: {len(failed_days)}."
+    )
+
+    try:
+        get_email_notifier().send_backfill_report(
+            date_from=args.date_from.isoformat(),
+            date_to=args.date_to.isoformat(),
+            done_days=done_days,
+            failed_days=failed_days,
+            api_records_cnt=api_records_cnt,
+            processed_records_cnt=processed_records_cnt,
+            exec_time=datetime.now() - start_time,
+        )
+    except Exception as err:
+        logger.error(f"Не удалось отправить итоговый email: {repr(err)}")
+
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,125 @@
+"""
+Бенчмарк HTTP-клиента APIClient на локальном сервере-заглушке.
+Сравнивает запросы через requests.get (новое соединение на каждый запрос)
+и через сессию APIClient (соединения переиспользуются): время серии запросов,
+число открытых соединений и переданный объем. Отдельно проверяет, что сессия
+переживает временные ответы 502, на которых requests.get падает.
+
+Запуск из папки etl:
+    python -m benchmarks.bench_api_session --requests 24 --records 20000
+"""
+
+from typing import Any, Dict
+from pathlib import Path
+import argparse
+import statistics
+import tempfile
+import time
+import requests
+from components import APIClient
+from benchmarks.stubs import LocalAPIServer
+from benchmarks.synthetic import iter_attempts, write_json_file
+
+PARAMS = {
+    "client": "bench",
+    "client_key": "bench",
+    "start": "2025-12-01 00:00:00.000000",
+    "end": "2025-12-01 23:59:59.999999",
+}
+
+
+def fetch_plain(url: str) -> Any:
+    """Запрос, как его делал APIClient до перехода на сессию."""
+    response = requests.get(url, params=PARAMS, timeout=180)
+    response.raise_for_status()
+    return response.json()
+
+
+def bench(
+    json_path: Path, client_name: str, requests_cnt: int, compress: bool
+) -> Dict[str, Any]:
+    """
+    Выполняет серию запросов клиентом client_name и возвращает время
+    и счетчики сервера. APIClient, как и в ETL, один на всю серию.
+    """
+    with LocalAPIServer(json_path, compress=compress) as server:
+        if client_name == "APIClient":
+            api_client = APIClient(server.url)
+            fetch = lambda: api_client.get_attempts_data(**PARAMS)  # noqa: E731
+        else:
+            fetch = lambda: fetch_plain(server.url)  # noqa: E731
+
+        started = time.perf_counter()
+        for _ in range(requests_cnt):
+            fetch()
+        elapsed = time.perf_counter() - started
+
+        if client_name == "APIClient":
+            api_client.close()
+
+    return {
+        "seconds": elapsed,
+        "connections": server.connections,
+        "mb_sent": server.bytes_sent / 1024 / 1024,
+    }
+
+
+def check_retries(json_path: Path, failures: int) -> Dict[str, str]:
+    """Проверяет, чем заканчивается запрос, если первые ответы сервера - 502."""
+    results = {}
+    with LocalAPIServer(json_path, failures=failures) as server:
+        try:
+            fetch_plain(server.url)
+            results["requests.get"] = "успех"
+        except requests.exceptions.HTTPError as err:
+            results["requests.get"] = f"ошибка {err.response.status_code}"
+
+    with LocalAPIServer(json_path, failures=failures) as server:
+        api_client = APIClient(server.url, retries=failures + 1, backoff=0.1)
+        try:
+            api_client.get_attempts_data(**PARAMS)
+            results["APIClient"] = f"успех, запросов к серверу: {server.requests}"
+        except requests.exceptions.HTTPError as err:
+            results["APIClient"] = f"ошибка {err.response.status_code}"
+        finally:
+            api_client.close()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=24, help="Запросов в серии")
+    parser.add_argument("--records", type=int, default=20000, help="Записей в ответе")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--failures", type=int, default=2, help="Ответов 502 подряд")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = Path(tmp_dir) / "attempts.json"
+        write_json_file(json_path, iter_attempts(args.records))
+
+        print(
+            f"{'Клиент':<14} {'сжатие':<7} {'время, с':>9} {'соединений':>11} {'передано, МБ':>13}"
+        )
+        for compress in (False, True):
+            for client_name in ("requests.get", "APIClient"):
+                runs = [
+                    bench(json_path, client_name, args.requests, compress)
+                    for _ in range(args.repeat)
+                ]
+                print(
+                    f"{client_name:<14} {'да' if compress else 'нет':<7} "
+                    f"{statistics.median(run['seconds'] for run in runs):>9.2f} "
+                    f"{runs[-1]['connections']:>11} {runs[-1]['mb_sent']:>13.1f}"
+                )
+
+        print(f"\nПервые {args.failures} ответа сервера - 502:")
+        for name, result in check_retries(json_path, args.failures).items():
+            print(f"  {name:<14} {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Бенчмарк времени запуска: для каждого сценария запускает отдельный
+интерпретатор и замеряет время импорта, полное время процесса (вместе
+с запуском интерпретатора) и пиковую память. Показывает, какие тяжелые
+библиотеки загрузил сценарий. Результат - медиана по --repeat запускам.
+
+Запуск из папки etl:
+    python -m benchmarks.bench_import_time --repeat 5
+"""
+
+from typing import Any, Dict, List
+from pathlib import Path
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+ETL_DIR = Path(__file__).parent.parent
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "gspread", "psycopg2", "requests"]
+
+# Сценарий - код, который выполняется в новом интерпретаторе
+SCENARIOS = {
+    "import main": "import main",
+    "import backfill": "import backfill",
+    "import components": "import components",
+    "путь с ошибкой (email)": "import main; main.EmailNotifier",
+    "только API": "from components import APIClient",
+    "только БД": "from components import DatabaseInserter",
+    "построчная обработка": "from components import DataProcessor",
+    "колоночная обработка": (
+        "from components import DataProcessor; "
+        "DataProcessor.processing_attempts_columnar([])"
+    ),
+    "Google Sheets": "from components import GoogleSheetsReporter",
+    "архив Parquet": "from components import ParquetArchiver",
+}
+
+# Код-обертка: замеряет сценарий внутри процесса и печатает результат в JSON
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+exec({code!r})
+import_time = time.perf_counter() - started
+try:
+    import resource
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = max_rss / 1024 / 1024 if sys.platform == "darwin" else max_rss / 1024
+except ImportError:
+    peak_rss_mb = None
+print(json.dumps({{
+    "import_time": import_time,
+    "peak_rss_mb": peak_rss_mb,
+    "heavy_modules": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def run_scenario(code: str) -> Dict[str, Any]:
+    """Выполняет сценарий в новом интерпретаторе и возвращает замеры."""
+    probe = PROBE.format(code=code, heavy=HEAVY_MODULES)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=ETL_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_time = time.perf_counter() - started
+
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    measurement["total_time"] = total_time
+    return measurement
+
+
+def bench(code: str, repeat: int) -> Dict[str, Any]:
+    """Медианы замеров сценария по repeat запускам."""
+    runs: List[Dict[str, Any]] = [run_scenario(code) for _ in range(repeat)]
+    peak_rss = [run["peak_rss_mb"] for run in runs if run["peak_rss_mb"] is not None]
+    return {
+        "import_ms": round(
+            statistics.median(run["import_time"] for run in runs) * 1000
+        ),
+        "total_ms": round(statistics.median(run["total_time"] for run in runs) * 1000),
+        "peak_rss_mb": round(statistics.median(peak_rss), 1) if peak_rss else None,
+        "heavy_modules": runs[-1]["heavy_modules"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=list(SCENARIOS),
+        default=list(SCENARIOS),
+        help="Какие сценарии замерять",
+    )
+    parser.add_argument("--json", type=Path, help="Сохранить результаты в JSON-файл")
+    args = parser.parse_args()
+
+    # Первый запуск прогревает кэш байткода и файловый кэш ОС
+    run_scenario("import main")
+
+    results = []
+    print(
+        f"{'Сценарий':<26} {'импорт, мс':>11} {'всего, мс':>10} {'пик, МБ':>8}  Загружено"
+    )
+    for name in args.scenarios:
+        result = {"name": name, **bench(SCENARIOS[name], args.repeat)}
+        results.append(result)
+        peak = result["peak_rss_mb"]
+        print(
+            f"{name:<26} {result['import_ms']:>11} {result['total_ms']:>10} "
+            f"{peak if peak is not None else '-':>8}  "
+            f"{', '.join(result['heavy_modules']) or '-'}"
+        )
+
+    if args.json:
+        args.json.write_text(
+            json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+
+
+if __name__ == "__main__":
+    main()
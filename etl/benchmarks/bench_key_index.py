@@ -0,0 +1,80 @@
+"""
+Бенчмарк индекса ключей AttemptKeyIndex на синтетических записях.
+Для точного индекса и фильтра Блума замеряет память на ключ, скорость
+загрузки ключей и фильтрации записей. Половина записей считается уже
+загруженной в БД; проверка срабатываний фильтра Блума имитируется
+поиском по множеству ключей, без обращения к БД.
+
+Запуск из папки etl:
+    python -m benchmarks.bench_key_index --keys 100000 1000000
+"""
+
+from typing import Any, Dict, List
+import argparse
+import time
+from components import AttemptKeyIndex, DataProcessor
+from benchmarks.synthetic import iter_attempts
+
+
+def make_records(records: int) -> List[Any]:
+    """Синтетические записи, прошедшие валидацию."""
+    return DataProcessor.processing_attempts(list(iter_attempts(records)))
+
+
+def bench(records: List[Any], bloom_error: float = None) -> Dict[str, Any]:
+    """Замеры для точного индекса или, с bloom_error, для фильтра Блума."""
+    existing = records[: len(records) // 2]
+    existing_keys = {(r.user_id, r.attempt_type, r.created_at) for r in existing}
+
+    def verify(keys):
+        return [key for key in keys if key in existing_keys]
+
+    if bloom_error:
+        key_index = AttemptKeyIndex(len(existing), bloom_error)
+    else:
+        key_index = AttemptKeyIndex()
+
+    started = time.perf_counter()
+    key_index.update((r.user_id, r.attempt_type, r.created_at) for r in existing)
+    load_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    new_cnt = sum(1 for _ in key_index.filter(records, verify=verify))
+    filter_time = time.perf_counter() - started
+
+    return {
+        "index": f"Блум {bloom_error:.0%}" if bloom_error else "точный",
+        "bytes_per_key": key_index.size_bytes / len(existing),
+        "load_keys_per_sec": len(existing) / load_time,
+        "filter_rows_per_sec": len(records) / filter_time,
+        "new": new_cnt,
+        "existing": key_index.existing_cnt,
+        "false_positives": key_index.false_positive_cnt,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--keys", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--bloom-error", type=float, default=0.01)
+    args = parser.parse_args()
+
+    print(
+        f"{'Записей':>9}  {'Индекс':<9} {'байт/ключ':>10} {'ключей/с':>10} "
+        f"{'записей/с':>10} {'новых':>8} {'в БД':>8} {'ложных':>7}"
+    )
+    for records_cnt in args.keys:
+        records = make_records(records_cnt)
+        for bloom_error in (None, args.bloom_error):
+            result = bench(records, bloom_error)
+            print(
+                f"{records_cnt:>9}  {result['index']:<9} {result['bytes_per_key']:>10.1f} "
+                f"{result['load_keys_per_sec']:>10,.0f} {result['filter_rows_per_sec']:>10,.0f} "
+                f"{result['new']:>8} {result['existing']:>8} {result['false_positives']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Микробенчмарк разбора passback_params.
+Сравнивает ast.literal_eval (до) и parse_passback_params (после)
+на изолированном разборе и на полном DataProcessor.processing_attempts.
+
+Запуск из папки etl:
+    python -m benchmarks.bench_passback_params --records 200000
+"""
+
+from typing import Any, Callable
+import argparse
+import ast
+import time
+from components import DataProcessor
+from components import data_processor
+from components.passback_parser import parse_passback_params, _parse_cached
+from benchmarks.synthetic import generate_attempts
+
+
+def measure(func: Callable[[], Any], records: int) -> float:
+    """Возвращает пропускную способность в записях в секунду."""
+    started = time.perf_counter()
+    func()
+    return records / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=50)
+    args = parser.parse_args()
+
+    attempts = generate_attempts(args.records, users=args.users, tasks=args.tasks)
+    strings = [attempt["passback_params"] for attempt in attempts]
+    unique_cnt = len(set(strings))
+
+    def literal_eval_all():
+        for value in strings:
+            ast.literal_eval(value)
+
+    def parse_all():
+        for value in strings:
+            parse_passback_params(value)
+
+    def process_all():
+        DataProcessor.processing_attempts(attempts)
+
+    results = {}
+    results["literal_eval"] = measure(literal_eval_all, len(strings))
+
+    _parse_cached.cache_clear()
+    results["parser (холодный кэш)"] = measure(parse_all, len(strings))
+    results["parser (теплый кэш)"] = measure(parse_all, len(strings))
+
+    data_processor.parse_passback_params = ast.literal_eval
+    try:
+        results["processing_attempts до"] = measure(process_all, len(attempts))
+    finally:
+        data_processor.parse_passback_params = parse_passback_params
+
+    _parse_cached.cache_clear()
+    results["processing_attempts после"] = measure(process_all, len(attempts))
+
+    print(f"Записей: {len(attempts)}, уникальных passback_params: {unique_cnt}")
+    for name, rate in results.items():
+        print(f"{name:<28} {rate:>14,.0f} записей/с")
+
+
+if __name__ == "__main__":
+    main()
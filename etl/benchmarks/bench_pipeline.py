@@ -0,0 +1,280 @@
+"""
+Сквозной бенчмарк компонентов пайплайна на синтетических данных.
+Для каждого объема данных замеряет пропускную способность (записей в секунду)
+и пиковую память (tracemalloc) APIClient, DataProcessor, DatabaseInserter
+и GoogleSheetsReporter. API и Google Sheets заменяются локальными заглушками.
+
+DatabaseInserter замеряется, только если заданы BENCH_DB_HOST, BENCH_DB_PORT,
+BENCH_DB_NAME, BENCH_DB_USER и BENCH_DB_PASSWORD. Бенчмарк создает в этой БД
+таблицу attempts и очищает ее перед каждым замером - нужна отдельная тестовая база.
+
+Запуск из папки etl:
+    python -m benchmarks.bench_pipeline --sizes 10000 100000 1000000 10000000
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from contextlib import ExitStack
+from pathlib import Path
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import psycopg2
+from components import APIClient, DataProcessor, DatabaseInserter
+from benchmarks.stubs import LocalAPIServer, LocalWorksheet, make_sheets_reporter
+from benchmarks.synthetic import iter_attempts, iter_batches, write_json_file
+
+DDL_PATH = Path(__file__).parent.parent.parent / "ddl" / "create_table_attempts.sql"
+PERIOD = ("2025-12-01 00:00:00.000000", "2025-12-01 23:59:59.999999")
+COMPONENTS = ["api", "processor", "db", "sheets"]
+
+
+def measure(
+    run: Callable[[], float], records: int, trace_memory: bool
+) -> Tuple[float, Optional[float]]:
+    """
+    Выполняет замер. run возвращает время работы замеряемого кода в секундах,
+    подготовка данных внутри run в это время не входит.
+    Пиковая память замеряется отдельным прогоном, так как tracemalloc
+    замедляет код. Возвращает записей в секунду и пиковую память в МБ.
+    """
+    gc.collect()
+    rate = records / run()
+
+    peak_mb = None
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_mb = peak / 1024 / 1024
+
+    return rate, peak_mb
+
+
+def generate(args: argparse.Namespace, records: int) -> Iterator[Dict[str, Any]]:
+    """Поток синтетических записей с параметрами из командной строки."""
+    return iter_attempts(
+        records,
+        users=args.users,
+        invalid_share=args.invalid_share,
+        days=args.days,
+        seed=args.seed,
+    )
+
+
+def get_bench_db_params() -> Optional[Dict[str, str]]:
+    """Параметры тестовой БД из BENCH_DB_*, None - если заданы не все."""
+    params = {
+        "host": os.getenv("BENCH_DB_HOST"),
+        "port": os.getenv("BENCH_DB_PORT"),
+        "database": os.getenv("BENCH_DB_NAME"),
+        "user": os.getenv("BENCH_DB_USER"),
+        "password": os.getenv("BENCH_DB_PASSWORD"),
+    }
+    return params if all(params.values()) else None
+
+
+def reset_bench_db(db_params: Dict[str, str]) -> None:
+    """Создает таблицу attempts в тестовой БД, если ее нет, и очищает ее."""
+    connection = psycopg2.connect(**db_params)
+    try:
+        with connection, connection.cursor() as cursor:
+            cursor.execute(DDL_PATH.read_text(encoding="utf-8"))
+            cursor.execute("TRUNCATE attempts")
+    finally:
+        connection.close()
+
+
+def bench_api(
+    args: argparse.Namespace, records: int, url: str
+) -> Dict[str, Callable[[], float]]:
+    """Замеры APIClient против локального HTTP-сервера."""
+    client = APIClient(url=url)
+
+    def stream() -> float:
+        started = time.perf_counter()
+        for _ in client.iter_attempts_data("bench", "bench", *PERIOD, args.batch_size):
+            pass
+        return time.perf_counter() - started
+
+    def full() -> float:
+        started = time.perf_counter()
+        client.get_attempts_data("bench", "bench", *PERIOD)
+        return time.perf_counter() - started
+
+    runs = {"APIClient.iter_attempts_data": stream}
+    if records <= args.max_list_records:
+        runs["APIClient.get_attempts_data"] = full
+    return runs
+
+
+def bench_processor(
+    args: argparse.Namespace, records: int
+) -> Dict[str, Callable[[], float]]:
+    """Замеры DataProcessor пачками по batch_size записей."""
+
+    def run_with(process: Callable[[List[Dict[str, Any]]], Any]) -> Callable[[], float]:
+        def run() -> float:
+            elapsed = 0.0
+            for batch in iter_batches(generate(args, records), args.batch_size):
+                started = time.perf_counter()
+                process(batch)
+                elapsed += time.perf_counter() - started
+            return elapsed
+
+        return run
+
+    return {
+        "DataProcessor.processing_attempts": run_with(
+            DataProcessor.processing_attempts
+        ),
+        "DataProcessor.processing_attempts_columnar": run_with(
+            DataProcessor.processing_attempts_columnar
+        ),
+    }
+
+
+def bench_db(
+    args: argparse.Namespace, records: int, db_params: Dict[str, str]
+) -> Dict[str, Callable[[], float]]:
+    """Замеры DatabaseInserter на тестовой БД, одна транзакция на весь объем."""
+    db_inserter = DatabaseInserter(**db_params)
+
+    def run_with(insert: Callable[[List[Tuple]], Any]) -> Callable[[], float]:
+        def run() -> float:
+            reset_bench_db(db_params)
+            elapsed = 0.0
+            for batch in iter_batches(generate(args, records), args.batch_size):
+                processed_batch = DataProcessor.processing_attempts(batch)
+                started = time.perf_counter()
+                insert(processed_batch)
+                elapsed += time.perf_counter() - started
+
+            started = time.perf_counter()
+            db_inserter.commit()
+            return elapsed + time.perf_counter() - started
+
+        return run
+
+    return {
+        "DatabaseInserter.insert_attempts": run_with(
+            lambda rows: db_inserter.insert_attempts(rows, commit=False)
+        ),
+        "DatabaseInserter.copy_attempts": run_with(
+            lambda rows: db_inserter.copy_attempts(rows, commit=False)
+        ),
+    }
+
+
+def bench_sheets(
+    args: argparse.Namespace, records: int
+) -> Dict[str, Callable[[], float]]:
+    """
+    Замер подсчета статистики и записи в локальный лист вместо Google Sheets.
+    Записи обрабатываются заранее, чтобы в замер времени и памяти
+    попадал только append_stats.
+    """
+    processed_attempts = []
+    for batch in iter_batches(generate(args, records), args.batch_size):
+        processed_attempts.extend(DataProcessor.processing_attempts(batch))
+
+    def run() -> float:
+        reporter = make_sheets_reporter(LocalWorksheet())
+        started = time.perf_counter()
+        reporter.append_stats(processed_attempts)
+        return time.perf_counter() - started
+
+    return {"GoogleSheetsReporter.append_stats": run}
+
+
+def parse_args() -> argparse.Namespace:
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000, 10_000_000],
+        help="Объемы данных в записях",
+    )
+    parser.add_argument(
+        "--components",
+        nargs="+",
+        choices=COMPONENTS,
+        default=COMPONENTS,
+        help="Какие компоненты замерять",
+    )
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument(
+        "--invalid-share", type=float, default=0.01, help="Доля невалидных записей"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--max-list-records",
+        type=int,
+        default=1_000_000,
+        help="До какого объема замерять get_attempts_data (весь ответ в памяти)",
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="Не замерять пиковую память"
+    )
+    parser.add_argument("--json", type=Path, help="Сохранить результаты в JSON-файл")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    db_params = get_bench_db_params()
+    if "db" in args.components and db_params is None:
+        print("BENCH_DB_* не заданы, DatabaseInserter пропускается.")
+
+    results = []
+    print(f"{'Записей':>10}  {'Замер':<45} {'записей/с':>14} {'пик, МБ':>10}")
+
+    for records in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir, ExitStack() as stack:
+            runs = {}
+            if "api" in args.components:
+                json_path = Path(tmp_dir) / "attempts.json"
+                write_json_file(json_path, generate(args, records))
+                server = stack.enter_context(LocalAPIServer(json_path))
+                runs.update(bench_api(args, records, server.url))
+            if "processor" in args.components:
+                runs.update(bench_processor(args, records))
+            if "db" in args.components and db_params is not None:
+                runs.update(bench_db(args, records, db_params))
+            if "sheets" in args.components:
+                runs.update(bench_sheets(args, records))
+
+            for name, run in runs.items():
+                rate, peak_mb = measure(run, records, not args.no_memory)
+                peak = f"{peak_mb:>10.1f}" if peak_mb is not None else f"{'-':>10}"
+                print(f"{records:>10}  {name:<45} {rate:>14,.0f} {peak}")
+                results.append(
+                    {
+                        "records": records,
+                        "name": name,
+                        "records_per_sec": round(rate),
+                        "peak_mb": None if peak_mb is None else round(peak_mb, 1),
+                    }
+                )
+
+    if args.json:
+        args.json.write_text(
+            json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Проверка, что построчная, параллельная и колоночная обработка DataProcessor
+дают одинаковый результат на синтетических записях: те же валидные записи
+с теми же значениями и то же количество пропусков по причинам.
+К синтетическим записям добавляются пограничные случаи (is_correct = None,
+NaN или без поля, лишние знаки в долях секунды created_at).
+При расхождении печатает первые отличия и завершается с кодом 1.
+
+Запуск из папки etl:
+    python -m benchmarks.check_backends --records 100000
+"""
+
+from typing import Any, Dict, List, Tuple
+import argparse
+import copy
+import sys
+import pandas as pd
+from components import DataProcessor
+from benchmarks.synthetic import generate_attempts
+
+
+def add_edge_cases(attempts: List[Dict[str, Any]]) -> None:
+    """Добавляет копии первых записей с пограничными значениями полей."""
+    base = attempts[0]
+    for is_correct in (None, 0, 1, True, 1.0, float("nan"), 2):
+        attempts.append({**base, "is_correct": is_correct})
+    attempts.append({key: value for key, value in base.items() if key != "is_correct"})
+    for created_at in (
+        "2025-12-01 10:00:00.1",
+        "2025-12-01 10:00:00.123456",
+        "2025-12-01 10:00:00.1234567",
+        "2025-12-01 10:00:00.123456789",
+        "2025-12-01 10:00:00",
+    ):
+        attempts.append({**base, "created_at": created_at})
+
+
+def columnar_rows(
+    attempts: List[Dict[str, Any]], rejections: Dict[str, int]
+) -> List[Tuple]:
+    """Результат колоночной обработки в виде кортежей, как у AttemptRecord."""
+    attempts_df, _ = DataProcessor.processing_attempts_columnar(
+        attempts, rejections=rejections
+    )
+    return [
+        (
+            *row[:4],
+            None if pd.isna(row[4]) else bool(row[4]),
+            str(row[5]),
+            row[6].to_pydatetime(),
+        )
+        for row in attempts_df.astype(object).itertuples(index=False, name=None)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--invalid-share", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    attempts = generate_attempts(args.records, invalid_share=args.invalid_share)
+    add_edge_cases(attempts)
+
+    results = {}
+    rejections = {name: {} for name in ("построчная", "параллельная", "колоночная")}
+    results["построчная"] = [
+        tuple(record)
+        for record in DataProcessor.processing_attempts(
+            copy.deepcopy(attempts), rejections=rejections["построчная"]
+        )
+    ]
+    results["параллельная"] = [
+        tuple(record)
+        for record in DataProcessor.processing_attempts_parallel(
+            copy.deepcopy(attempts),
+            workers=args.workers,
+            min_records=0,
+            rejections=rejections["параллельная"],
+        )
+    ]
+    results["колоночная"] = columnar_rows(
+        copy.deepcopy(attempts), rejections["колоночная"]
+    )
+
+    expected = results["построчная"]
+    ok = True
+    print(f"Записей: {len(attempts)}")
+    for name, rows in results.items():
+        diff = [
+            (num, row, other)
+            for num, (row, other) in enumerate(zip(expected, rows))
+            if row != other
+        ]
+        same = (
+            not diff
+            and len(rows) == len(expected)
+            and rejections[name] == rejections["построчная"]
+        )
+        ok = ok and same
+        print(
+            f"  {name:<13} валидных: {len(rows):>8}, "
+            f"пропущено: {sum(rejections[name].values()):>6}  "
+            f"{'совпадает' if same else 'РАСХОЖДЕНИЕ'}"
+        )
+        if not same:
+            print(f"    причины: {rejections[name]}")
+            for num, row, other in diff[:3]:
+                print(f"    запись {num}: {row} != {other}")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
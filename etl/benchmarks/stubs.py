@@ -0,0 +1,162 @@
+"""
+Локальные заменители внешних сервисов для бенчмарков:
+HTTP-сервер вместо API и лист в памяти вместо Google Sheets.
+"""
+
+from typing import Any, Dict, List, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import gzip
+import logging
+import shutil
+import threading
+from gspread.utils import a1_range_to_grid_range
+from components import GoogleSheetsReporter
+
+# Размер чанка при отдаче файла с ответом
+CHUNK_SIZE = 64 * 1024
+
+
+class LocalAPIServer:
+    """
+    HTTP-сервер на localhost, который на любой GET отдает JSON-файл с записями.
+    Используется как контекстный менеджер, адрес сервера - в url.
+    compress=True - ответ сжимается gzip, если клиент его принимает,
+    failures - сколько первых запросов получат ответ 502.
+    Счетчики requests, connections и bytes_sent - для сравнения клиентов.
+    """
+
+    def __init__(
+        self,
+        json_path: Path,
+        compress: bool = False,
+        failures: int = 0,
+        keep_alive: bool = True,
+    ):
+        json_path = Path(json_path)
+        # Сжатый ответ готовится один раз, чтобы не замерять скорость gzip
+        gzip_body = gzip.compress(json_path.read_bytes()) if compress else None
+        server = self
+        self.requests = 0
+        self.connections = 0
+        self.bytes_sent = 0
+        self._failures = failures
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" if keep_alive else "HTTP/1.0"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    fail = server._failures > 0
+                    server._failures -= fail
+
+                if fail:
+                    self.send_response(502)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                if gzip_body and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    self.send_header("Content-Encoding", "gzip")
+                    self.send_header("Content-Length", str(len(gzip_body)))
+                    self.end_headers()
+                    self.wfile.write(gzip_body)
+                    sent = len(gzip_body)
+                else:
+                    sent = json_path.stat().st_size
+                    self.send_header("Content-Length", str(sent))
+                    self.end_headers()
+                    with open(json_path, "rb") as file:
+                        shutil.copyfileobj(file, self.wfile, CHUNK_SIZE)
+
+                with server._lock:
+                    server.bytes_sent += sent
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Адрес сервера."""
+        return f"http://127.0.0.1:{self._server.server_port}/"
+
+    def __enter__(self) -> "LocalAPIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+class LocalWorksheet:
+    """
+    Лист Google Sheets в памяти с методами, которые использует GoogleSheetsReporter.
+    Как и настоящий лист, не дает писать за пределы row_count строк.
+    calls - количество запросов, которые ушли бы в Google Sheets API.
+    """
+
+    def __init__(self, row_count: int = 1000):
+        self.rows: List[List[Any]] = []
+        self.row_count = row_count
+        self.calls = 0
+
+    def batch_get(self, ranges: List[str]) -> List[List[List[Any]]]:
+        self.calls += 1
+        result = []
+        for range_name in ranges:
+            grid = a1_range_to_grid_range(range_name)
+            rows = self.rows[grid["startRowIndex"] : grid.get("endRowIndex")]
+            columns = slice(grid["startColumnIndex"], grid.get("endColumnIndex"))
+            values = [row[columns] for row in rows]
+            # API не возвращает пустые строки в конце диапазона
+            while values and not values[-1]:
+                values.pop()
+            result.append(values)
+        return result
+
+    def batch_update(self, data: List[Dict[str, Any]]) -> None:
+        self.calls += 1
+        for value_range in data:
+            grid = a1_range_to_grid_range(value_range["range"])
+            if grid["endRowIndex"] > self.row_count:
+                raise ValueError(f"Диапазон {value_range['range']} за пределами листа")
+            for row_num, values in enumerate(
+                value_range["values"], start=grid["startRowIndex"]
+            ):
+                while len(self.rows) <= row_num:
+                    self.rows.append([])
+                self.rows[row_num] = list(values)
+
+    def add_rows(self, rows: int) -> None:
+        self.calls += 1
+        self.row_count += rows
+
+
+def make_sheets_reporter(worksheet: LocalWorksheet) -> GoogleSheetsReporter:
+    """Создает GoogleSheetsReporter, который пишет в локальный лист без подключения к Google."""
+    reporter = GoogleSheetsReporter.__new__(GoogleSheetsReporter)
+    reporter._logger = logging.getLogger("GoogleSheetsReporter")
+    reporter._retries = 1
+    reporter._backoff = 0.0
+    reporter._date_rows = None
+    reporter._next_row = 2
+    reporter._headers_ok = False
+    reporter._pending = None
+    reporter._spreadsheet = None
+    reporter._sheet1 = worksheet
+    return reporter
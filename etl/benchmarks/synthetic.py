@@ -0,0 +1,113 @@
+"""
+Генератор синтетических попыток в формате ответа API.
+Одинаковые параметры и seed дают одинаковые данные, поэтому замеры сравнимы между запусками.
+"""
+
+from typing import Any, Callable, Dict, Iterator, List
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+import json
+import random
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+CONSUMER_KEYS = ["", "lms-key-1", "lms-key-2"]
+SERVICE_URLS = [
+    "https://lms.example.com/courses/course-v1:LMS+DST+2025/xblock/"
+    "block-v1:LMS+DST+2025+type@lti+block@{task}/handler_noauth/grade_handler",
+    "https://lms.example.com/courses/course-v1:LMS+PY+2025/xblock/"
+    "block-v1:LMS+PY+2025+type@lti+block@{task}/handler_noauth/grade_handler",
+]
+
+# Порча записи: каждая функция ломает одну проверку DataProcessor
+INVALID_MUTATIONS: List[Callable[[Dict[str, Any]], None]] = [
+    lambda attempt: attempt.update(lti_user_id=None),
+    lambda attempt: attempt.update(lti_user_id=12345),
+    lambda attempt: attempt.update(attempt_type="debug"),
+    lambda attempt: attempt.update(is_correct=2),
+    lambda attempt: attempt.update(created_at="2025-13-01 25:00:00"),
+    lambda attempt: attempt.update(passback_params="{'oauth_consumer_key': "),
+    lambda attempt: attempt.update(passback_params="{'oauth_consumer_key': 1}"),
+]
+
+
+def iter_attempts(
+    records: int,
+    users: int = 1000,
+    tasks: int = 50,
+    invalid_share: float = 0.0,
+    start_date: str = "2025-12-01",
+    days: int = 1,
+    seed: int = 42,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Генерирует records записей API по одной, не держа их все в памяти.
+    Записи равномерно распределены по days дням начиная со start_date и идут
+    по возрастанию created_at. passback_params повторяется для каждой пары
+    пользователь-задача, как в реальных данных. invalid_share - доля записей,
+    испорченных одним из способов INVALID_MUTATIONS.
+    """
+    rnd = random.Random(seed)
+    start = datetime.fromisoformat(start_date)
+    step = timedelta(days=days) / max(records, 1)
+
+    for num in range(records):
+        user_num = rnd.randrange(users)
+        task_num = rnd.randrange(tasks)
+        user_id = f"{user_num:032x}"
+        task = f"{task_num:032x}"
+        attempt_type = "submit" if rnd.random() < 0.35 else "run"
+        passback_params = {
+            "oauth_consumer_key": CONSUMER_KEYS[user_num % len(CONSUMER_KEYS)],
+            "lis_result_sourcedid": f"course-v1:LMS+DST+2025:lms.example.com-{task}:{user_id}",
+            "lis_outcome_service_url": SERVICE_URLS[
+                task_num % len(SERVICE_URLS)
+            ].format(task=task),
+        }
+        attempt = {
+            "lti_user_id": user_id,
+            "attempt_type": attempt_type,
+            "is_correct": (
+                int(rnd.random() < 0.4) if attempt_type == "submit" else None
+            ),
+            "created_at": (start + step * num).strftime(DATE_FORMAT),
+            "passback_params": str(passback_params),
+        }
+
+        if invalid_share and rnd.random() < invalid_share:
+            rnd.choice(INVALID_MUTATIONS)(attempt)
+
+        yield attempt
+
+
+def generate_attempts(records: int, **kwargs: Any) -> List[Dict[str, Any]]:
+    """Возвращает список записей iter_attempts. Параметры те же."""
+    return list(iter_attempts(records, **kwargs))
+
+
+def iter_batches(
+    attempts: Iterator[Dict[str, Any]], batch_size: int
+) -> Iterator[List[Dict[str, Any]]]:
+    """Делит поток записей на пачки по batch_size штук."""
+    while batch := list(islice(attempts, batch_size)):
+        yield batch
+
+
+def write_json_file(path: Path, attempts: Iterator[Dict[str, Any]]) -> int:
+    """
+    Записывает записи в файл как JSON-массив в формате ответа API.
+    Файл пишется потоково, поэтому подходит и для миллионов записей.
+    Возвращает количество записей.
+    """
+    records_cnt = 0
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("[")
+        for attempt in attempts:
+            if records_cnt:
+                file.write(",")
+            file.write(json.dumps(attempt, ensure_ascii=False))
+            records_cnt += 1
+        file.write("]")
+
+    return records_cnt
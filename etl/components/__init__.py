@@ -1,16 +1,63 @@
-from .api_client import APIClient
-from .data_processor import DataProcessor
-from .database_inserter import DatabaseInserter
-from .google_sheets_reporter import GoogleSheetsReporter
-from .email_notifier import EmailNotifier
+from typing import TYPE_CHECKING, Any, List
+import importlib
 from .logger_configs import setup_logging, clean_old_logs
 
+# Компоненты импортируются при первом обращении: тяжелые библиотеки
+# (pandas, pyarrow, gspread, psycopg2) загружаются, только если нужны
+_COMPONENTS = {
+    "APIClient": ".api_client",
+    "ResponseCache": ".response_cache",
+    "DataProcessor": ".data_processor",
+    "AttemptRecord": ".attempt_record",
+    "AttemptKeyIndex": ".attempt_key_index",
+    "DatabaseInserter": ".database_inserter",
+    "GoogleSheetsReporter": ".google_sheets_reporter",
+    "EmailNotifier": ".email_notifier",
+    "HyperLogLog": ".hyperloglog",
+    "ParquetArchiver": ".parquet_archiver",
+    "RunReport": ".run_report",
+}
+
+if TYPE_CHECKING:
+    from .api_client import APIClient
+    from .response_cache import ResponseCache
+    from .data_processor import DataProcessor
+    from .attempt_record import AttemptRecord
+    from .attempt_key_index import AttemptKeyIndex
+    from .database_inserter import DatabaseInserter
+    from .google_sheets_reporter import GoogleSheetsReporter
+    from .email_notifier import EmailNotifier
+    from .hyperloglog import HyperLogLog
+    from .parquet_archiver import ParquetArchiver
+    from .run_report import RunReport
+
 __all__ = [
     "APIClient",
+    "ResponseCache",
     "DataProcessor",
+    "AttemptRecord",
+    "AttemptKeyIndex",
     "DatabaseInserter",
     "GoogleSheetsReporter",
     "EmailNotifier",
+    "HyperLogLog",
+    "ParquetArchiver",
+    "RunReport",
     "setup_logging",
     "clean_old_logs",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    """Импортирует модуль компонента при первом обращении к нему."""
+    if name not in _COMPONENTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_COMPONENTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    """Список имен пакета вместе с еще не импортированными компонентами."""
+    return sorted(__all__)
@@ -1,25 +1,252 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, Callable, List, Iterable, Iterator, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import codecs
+import json
 import logging
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from .logger_configs import setup_logging
+from .response_cache import ResponseCache
 
 setup_logging()
 
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+# Коды ответа API, при которых запрос повторяется: перегрузка и сбои сервера
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def split_date_range(start: str, end: str, shard_hours: int) -> List[Tuple[str, str]]:
+    """
+    Делит период [start, end] на подпериоды по shard_hours часов.
+    Границы включительные, как в get_date_range: конец подпериода
+    на 1 микросекунду меньше начала следующего.
+    """
+    if shard_hours < 1:
+        raise ValueError("shard_hours должен быть >= 1")
+
+    start_dt = datetime.strptime(start, DATE_FORMAT)
+    end_dt = datetime.strptime(end, DATE_FORMAT)
+    step = timedelta(hours=shard_hours)
+
+    shards = []
+    shard_start = start_dt
+    while shard_start <= end_dt:
+        shard_end = min(shard_start + step - timedelta(microseconds=1), end_dt)
+        shards.append(
+            (shard_start.strftime(DATE_FORMAT), shard_end.strftime(DATE_FORMAT))
+        )
+        shard_start = shard_start + step
+
+    return shards
+
+
+def _iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Инкрементально разбирает JSON-массив верхнего уровня из потока байтов.
+    Возвращает элементы массива по одному, не загружая весь ответ в память.
+    """
+    decoder = json.JSONDecoder()
+    utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+    whitespace = " \t\n\r"
+
+    buffer = ""
+    started = False  # Встретили ли открывающую скобку массива
+    expect_comma = False  # Ожидаем ли запятую перед следующим элементом
+    expect_item = False  # Ожидаем ли элемент после запятой
+    finished = False  # Встретили ли закрывающую скобку массива
+
+    def read(chunk: str, final: bool) -> Iterator[Any]:
+        nonlocal buffer, started, expect_comma, expect_item, finished
+        buffer += chunk
+        pos = 0
+        length = len(buffer)
+
+        while True:
+            while pos < length and buffer[pos] in whitespace:
+                pos += 1
+            if pos >= length:
+                break
+
+            if finished:
+                raise ValueError("Лишние данные после окончания JSON-массива.")
+
+            char = buffer[pos]
+            if not started:
+                if char != "[":
+                    raise ValueError("Ответ API не является JSON-массивом.")
+                started = True
+                pos += 1
+            elif char == "]" and not expect_item:
+                finished = True
+                pos += 1
+            elif expect_comma:
+                if char != ",":
+                    raise ValueError(f"Ожидалась ',' в позиции {pos} буфера.")
+                expect_comma = False
+                expect_item = True
+                pos += 1
+            else:
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break  # Элемент пришел не полностью, ждем следующий чанк
+
+                # Число на границе чанка может быть обрезано, дожидаемся продолжения
+                if end == length and not final:
+                    break
+
+                yield item
+                expect_comma = True
+                expect_item = False
+                pos = end
+
+        buffer = buffer[pos:]
+
+    for chunk in chunks:
+        yield from read(utf8_decoder.decode(chunk), final=False)
+    yield from read(utf8_decoder.decode(b"", final=True), final=True)
+
+    if not finished:
+        raise ValueError("JSON-массив оборван: нет закрывающей скобки.")
+
+
+def _tee(chunks: Iterable[bytes], write: Callable[[bytes], Any]) -> Iterator[bytes]:
+    """Передает чанки дальше, параллельно записывая их через write."""
+    for chunk in chunks:
+        write(chunk)
+        yield chunk
+
 
 class APIClient:
     """
     Класс для получения данных по API.
+    С cache ответы за закрытые периоды сохраняются на диск и при повторных
+    запросах читаются оттуда. replay=True - режим воспроизведения:
+    данные берутся только из кэша, API не вызывается.
+    Запросы идут через одну сессию requests: соединения переиспользуются
+    (до pool_size одновременно), ответ передается в сжатом виде (gzip),
+    сбои соединения и ответы RETRY_STATUS_CODES повторяются до retries раз
+    с экспоненциальной паузой и случайной добавкой, с учетом Retry-After.
     """
 
-    def __init__(self, url: str):
+    def __init__(
+        self,
+        url: str,
+        cache: Optional[ResponseCache] = None,
+        replay: bool = False,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 180.0,
+        retries: int = 3,
+        backoff: float = 1.0,
+        pool_size: int = 10,
+    ):
+        if replay and cache is None:
+            raise ValueError("Для режима воспроизведения нужен кэш")
+
         self._url = url
+        self._cache = cache
+        self._replay = replay
+        self._timeout = (connect_timeout, read_timeout)
         self._logger = logging.getLogger("APIClient")
+        self._session = self._create_session(retries, backoff, pool_size)
 
     @property
     def url(self) -> str:
         """Getter для url (Только чтение)"""
         return self._url
 
+    @staticmethod
+    def _create_session(
+        retries: int, backoff: float, pool_size: int
+    ) -> requests.Session:
+        """
+        Создает сессию с пулом соединений и политикой повторов.
+        Используется только внутри класса APIClient.
+        """
+        retry = Retry(
+            total=retries,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset({"GET"}),
+            backoff_factor=backoff,
+            backoff_jitter=backoff,
+            backoff_max=60,
+            respect_retry_after_header=True,
+            # После последней попытки ответ возвращается, ошибку поднимает raise_for_status
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+
+        session = requests.Session()
+        session.headers["Accept-Encoding"] = "gzip, deflate"
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def close(self) -> None:
+        """Закрывает соединения сессии."""
+        self._session.close()
+
+    @staticmethod
+    def _check_params(*params: str) -> None:
+        """Проверяет, что все параметры запроса заполнены."""
+        if not all(params):
+            raise ValueError("Все параметры должны быть заполнены")
+
+    def _is_cacheable(self, end: str) -> bool:
+        """
+        Проверяет, можно ли сохранить период в кэш: данные закрытого
+        (полностью прошедшего) дня больше не меняются.
+        Используется только внутри класса APIClient.
+        """
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        return self._cache is not None and datetime.strptime(end, DATE_FORMAT) < today
+
+    def _check_cached(self, client: str, start: str, end: str) -> bool:
+        """
+        Проверяет, есть ли период в кэше. В режиме воспроизведения
+        отсутствие периода в кэше - ошибка FileNotFoundError.
+        Используется только внутри класса APIClient.
+        """
+        if self._cache is not None and self._cache.contains(client, start, end):
+            return True
+
+        if self._replay:
+            error_msg = f"Режим воспроизведения: периода {start} - {end} нет в кэше"
+            self._logger.error(error_msg)
+            raise FileNotFoundError(error_msg)
+
+        return False
+
+    def _iter_batches(
+        self, chunks: Iterable[bytes], batch_size: int, source: str
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Разбирает поток байтов с JSON-массивом и возвращает записи пачками.
+        Используется только внутри класса APIClient.
+        """
+        records_cnt = 0
+        batch = []
+        for attempt in _iter_json_array(chunks):
+            batch.append(attempt)
+            if len(batch) >= batch_size:
+                records_cnt += len(batch)
+                yield batch
+                batch = []
+
+        if batch:
+            records_cnt += len(batch)
+            yield batch
+
+        self._logger.info(f"Успешно получено {records_cnt} записей {source}.")
+
     def get_attempts_data(
         self, client: str, client_key: str, start: str, end: str
     ) -> List[Dict[str, Any]]:
@@ -27,10 +254,21 @@ class APIClient:
         Извлекаем данные о попытках студентов с помощью API.
         """
 
-        if not all([client, client_key, start, end]):
-            error_msg = "Все параметры должны быть заполнены"
-            self._logger.error(error_msg)
-            raise ValueError(error_msg)
+        try:
+            self._check_params(client, client_key, start, end)
+        except ValueError as err:
+            self._logger.error(str(err))
+            raise
+
+        if self._check_cached(client, start, end):
+            attempts_data = self._cache.get(client, start, end)
+            if attempts_data is not None:
+                return attempts_data
+            # Файл мог быть вытеснен из кэша после проверки
+            if self._replay:
+                error_msg = f"Режим воспроизведения: периода {start} - {end} нет в кэше"
+                self._logger.error(error_msg)
+                raise FileNotFoundError(error_msg)
 
         params = {
             "client": client,
@@ -41,15 +279,23 @@ class APIClient:
         try:
             self._logger.info(f"Запрос данных за период {start} - {end}")
 
-            response = requests.get(self._url, params=params, timeout=180)
+            response = self._session.get(
+                self._url, params=params, timeout=self._timeout
+            )
             response.raise_for_status()
 
             attempts_data = response.json()
             self._logger.info(f"Успешно получено {len(attempts_data)} записей от API.")
+
+            if self._is_cacheable(end):
+                self._cache.put(client, start, end, attempts_data)
             return attempts_data
 
         except requests.exceptions.Timeout as err:
-            self._logger.error(f"Запрос к API выполнялся более 3 минут: {repr(err)}.")
+            self._logger.error(
+                f"Превышено время ожидания API (соединение {self._timeout[0]} с, "
+                f"чтение {self._timeout[1]} с): {repr(err)}."
+            )
             raise
 
         except requests.exceptions.HTTPError as err:
@@ -65,3 +311,157 @@ class APIClient:
         except Exception as err:
             self._logger.error(f"Ошибка при получении данных от API: {repr(err)}.")
             raise
+
+    def iter_attempts_data(
+        self,
+        client: str,
+        client_key: str,
+        start: str,
+        end: str,
+        batch_size: int = 1000,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Потоковое извлечение данных о попытках студентов с помощью API.
+        Ответ читается по частям (stream=True) и разбирается инкрементально,
+        записи возвращаются пачками по batch_size штук.
+        """
+
+        try:
+            self._check_params(client, client_key, start, end)
+            if batch_size < 1:
+                raise ValueError("batch_size должен быть >= 1")
+        except ValueError as err:
+            self._logger.error(str(err))
+            raise
+
+        if self._check_cached(client, start, end):
+            self._logger.info(f"Потоковое чтение периода {start} - {end} из кэша")
+            yield from self._iter_batches(
+                self._cache.iter_chunks(client, start, end), batch_size, "из кэша"
+            )
+            return
+
+        params = {
+            "client": client,
+            "client_key": client_key,
+            "start": start,
+            "end": end,
+        }
+        try:
+            self._logger.info(f"Потоковый запрос данных за период {start} - {end}")
+
+            with self._session.get(
+                self._url, params=params, timeout=self._timeout, stream=True
+            ) as response:
+                response.raise_for_status()
+                chunks = response.iter_content(chunk_size=64 * 1024)
+
+                if self._is_cacheable(end):
+                    # Ответ пишется в кэш по мере чтения и сохраняется,
+                    # только если массив прочитан целиком
+                    with self._cache.writer(client, start, end) as write:
+                        yield from self._iter_batches(
+                            _tee(chunks, write), batch_size, "от API"
+                        )
+                else:
+                    yield from self._iter_batches(chunks, batch_size, "от API")
+
+        except requests.exceptions.Timeout as err:
+            self._logger.error(
+                f"Превышено время ожидания API (соединение {self._timeout[0]} с, "
+                f"чтение {self._timeout[1]} с): {repr(err)}."
+            )
+            raise
+
+        except requests.exceptions.HTTPError as err:
+            self._logger.error(
+                f"HTTP ошибка {err.response.status_code} при запросе к API: {repr(err)}."
+            )
+            raise
+
+        except requests.exceptions.RequestException as err:
+            self._logger.error(f"Ошибка соединения с API: {repr(err)}.")
+            raise
+
+        except Exception as err:
+            self._logger.error(f"Ошибка при получении данных от API: {repr(err)}.")
+            raise
+
+    def get_attempts_data_sharded(
+        self,
+        client: str,
+        client_key: str,
+        start: str,
+        end: str,
+        shard_hours: int = 1,
+        max_workers: int = 4,
+        retries: int = 3,
+    ) -> List[Dict[str, Any]]:
+        """
+        Извлекаем данные о попытках, разбивая период на подпериоды по shard_hours
+        часов и запрашивая их параллельно в max_workers потоков.
+        Сбои HTTP и соединения повторяет сессия, а подпериод целиком повторяется
+        до retries раз, только если ответ оборвался посреди JSON.
+        Результат упорядочен по времени и очищен от дубликатов
+        по ключу unique_attempt (user_id, attempt_type, created_at).
+        """
+        try:
+            self._check_params(client, client_key, start, end)
+        except ValueError as err:
+            self._logger.error(str(err))
+            raise
+
+        shards = split_date_range(start, end, shard_hours)
+        self._logger.info(
+            f"Период {start} - {end} разбит на {len(shards)} частей, потоков: {max_workers}."
+        )
+
+        def fetch_shard(shard: Tuple[str, str]) -> List[Dict[str, Any]]:
+            shard_start, shard_end = shard
+            for attempt_num in range(1, retries + 1):
+                try:
+                    return self.get_attempts_data(
+                        client, client_key, shard_start, shard_end
+                    )
+                except (
+                    requests.exceptions.JSONDecodeError,
+                    requests.exceptions.ChunkedEncodingError,
+                ) as err:
+                    if attempt_num == retries:
+                        raise
+                    delay = 2**attempt_num
+                    self._logger.warning(
+                        f"Попытка {attempt_num}/{retries} для периода "
+                        f"{shard_start} - {shard_end} не удалась: {repr(err)}. "
+                        f"Повтор через {delay} с."
+                    )
+                    time.sleep(delay)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            shards_data = list(executor.map(fetch_shard, shards))
+
+        # Склеиваем подпериоды по порядку и убираем дубликаты на стыках
+        attempts_data = []
+        seen_keys = set()
+        duplicates_cnt = 0
+        for shard_data in shards_data:
+            shard_data.sort(key=lambda attempt: str(attempt.get("created_at") or ""))
+            for attempt in shard_data:
+                key = (
+                    attempt.get("lti_user_id"),
+                    attempt.get("attempt_type"),
+                    attempt.get("created_at"),
+                )
+                try:
+                    if key in seen_keys:
+                        duplicates_cnt += 1
+                        continue
+                    seen_keys.add(key)
+                except TypeError:
+                    pass  # Нехешируемые значения отсеет DataProcessor
+                attempts_data.append(attempt)
+
+        self._logger.info(
+            f"Всего получено {len(attempts_data)} записей, дубликатов удалено: {duplicates_cnt}."
+        )
+        return attempts_data
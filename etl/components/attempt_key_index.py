@@ -0,0 +1,170 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from hashlib import blake2b
+from itertools import islice
+import math
+import sys
+import threading
+
+# Позиции полей ключа unique_attempt в записи AttemptRecord
+USER_ID_POS, ATTEMPT_TYPE_POS, CREATED_AT_POS = 0, 5, 6
+
+AttemptKey = Tuple[str, str, Any]
+
+
+def _key_hash(user_id: str, attempt_type: str, created_at: Any) -> int:
+    """
+    128-битный хэш ключа (user_id, attempt_type, created_at).
+    Дата приводится к isoformat, поэтому datetime из БД и pandas.Timestamp
+    из колоночной обработки дают одинаковый хэш.
+    """
+    value = f"{user_id}\x1f{attempt_type}\x1f{created_at.isoformat()}"
+    return int.from_bytes(
+        blake2b(value.encode("utf-8"), digest_size=16).digest(), "big"
+    )
+
+
+class AttemptKeyIndex:
+    """
+    Индекс ключей unique_attempt уже загруженных попыток: записи, которые
+    есть в БД, отбрасываются до вставки и не передаются по сети.
+    По умолчанию хранит 128-битные хэши ключей (около 100 байт на ключ,
+    совпадение хэшей разных ключей практически невозможно).
+    С bloom_capacity - фильтр Блума на bloom_capacity ключей с долей ложных
+    срабатываний bloom_error (около 1.2 байта на ключ при 1%): срабатывания
+    фильтра проверяются запросом к БД, поэтому новые записи не теряются.
+    """
+
+    def __init__(self, bloom_capacity: Optional[int] = None, bloom_error: float = 0.01):
+        if not 0 < bloom_error < 1:
+            raise ValueError("bloom_error должен быть в интервале (0, 1).")
+
+        self._lock = threading.Lock()
+        self.keys_cnt = 0
+        self.new_cnt = 0
+        self.existing_cnt = 0
+        # Срабатывания фильтра Блума, которые не подтвердились в БД
+        self.false_positive_cnt = 0
+
+        if bloom_capacity is None:
+            self._hashes = set()
+            self._bits = None
+            return
+
+        capacity = max(bloom_capacity, 1)
+        bits_cnt = math.ceil(-capacity * math.log(bloom_error) / math.log(2) ** 2)
+        self._hashes = None
+        self._bits_cnt = bits_cnt
+        self._bits = bytearray((bits_cnt + 7) // 8)
+        self._hashes_cnt = max(1, round(bits_cnt / capacity * math.log(2)))
+
+    @property
+    def is_bloom(self) -> bool:
+        """Используется ли фильтр Блума."""
+        return self._bits is not None
+
+    @property
+    def size_bytes(self) -> int:
+        """Примерный объем памяти индекса в байтах."""
+        if self.is_bloom:
+            return len(self._bits)
+        return sys.getsizeof(self._hashes) + self.keys_cnt * sys.getsizeof(1 << 127)
+
+    def _bit_positions(self, key_hash: int) -> List[int]:
+        """
+        Позиции битов ключа в фильтре Блума: из двух половин хэша
+        получается нужное количество хэш-функций (h1 + i * h2).
+        Используется только внутри класса AttemptKeyIndex.
+        """
+        first, second = key_hash >> 64, key_hash & ((1 << 64) - 1)
+        bits_cnt = self._bits_cnt
+        return [(first + i * second) % bits_cnt for i in range(self._hashes_cnt)]
+
+    def _might_contain(self, key_hash: int) -> bool:
+        """
+        Есть ли ключ в индексе. Для фильтра Блума True означает "возможно".
+        Используется только внутри класса AttemptKeyIndex.
+        """
+        if not self.is_bloom:
+            return key_hash in self._hashes
+
+        bits = self._bits
+        for position in self._bit_positions(key_hash):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, user_id: str, attempt_type: str, created_at: Any) -> None:
+        """Добавляет ключ в индекс."""
+        key_hash = _key_hash(user_id, attempt_type, created_at)
+        if self.is_bloom:
+            for position in self._bit_positions(key_hash):
+                self._bits[position >> 3] |= 1 << (position & 7)
+        else:
+            self._hashes.add(key_hash)
+        self.keys_cnt += 1
+
+    def update(self, keys: Iterable[AttemptKey]) -> None:
+        """Добавляет в индекс все ключи."""
+        for user_id, attempt_type, created_at in keys:
+            self.add(user_id, attempt_type, created_at)
+
+    def filter(
+        self,
+        rows: Iterable[Tuple],
+        verify: Optional[Callable[[List[AttemptKey]], Iterable[AttemptKey]]] = None,
+        chunk_size: int = 10000,
+        counts: Optional[Dict[str, int]] = None,
+    ) -> Iterator[Tuple]:
+        """
+        Возвращает только записи, ключей которых нет в индексе.
+        Для фильтра Блума возможные совпадения каждой части из chunk_size
+        записей передаются в verify, которая возвращает ключи, найденные в БД.
+        Без verify записи с возможным совпадением не отбрасываются.
+        В counts (если передан) добавляется количество новых (new)
+        и уже загруженных (existing) записей этого вызова.
+        """
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+
+            new_rows = []
+            candidates = []
+            for row in chunk:
+                key_hash = _key_hash(
+                    row[USER_ID_POS], row[ATTEMPT_TYPE_POS], row[CREATED_AT_POS]
+                )
+                if self._might_contain(key_hash):
+                    candidates.append((key_hash, row))
+                else:
+                    new_rows.append(row)
+
+            existing_cnt = len(candidates)
+            false_positive_cnt = 0
+            if candidates and self.is_bloom:
+                # Фильтр Блума может ошибиться: совпадения проверяются в БД
+                found = set()
+                if verify is not None:
+                    keys = [
+                        (row[USER_ID_POS], row[ATTEMPT_TYPE_POS], row[CREATED_AT_POS])
+                        for _, row in candidates
+                    ]
+                    found = {_key_hash(*key) for key in verify(keys)}
+                unconfirmed = [
+                    row for key_hash, row in candidates if key_hash not in found
+                ]
+                new_rows.extend(unconfirmed)
+                existing_cnt -= len(unconfirmed)
+                if verify is not None:
+                    false_positive_cnt = len(unconfirmed)
+
+            with self._lock:
+                self.new_cnt += len(new_rows)
+                self.existing_cnt += existing_cnt
+                self.false_positive_cnt += false_positive_cnt
+            if counts is not None:
+                counts["new"] = counts.get("new", 0) + len(new_rows)
+                counts["existing"] = counts.get("existing", 0) + existing_cnt
+
+            yield from new_rows
@@ -0,0 +1,29 @@
+from typing import NamedTuple, Optional
+from datetime import datetime
+import sys
+
+
+class AttemptRecord(NamedTuple):
+    """
+    Валидная попытка студента. Порядок полей совпадает со столбцами таблицы
+    attempts, поэтому запись передается в БД и в DataFrame как обычный кортеж,
+    а в коде к полям можно обращаться по имени. Экземпляры не хранят __dict__
+    и занимают столько же памяти, сколько кортеж.
+    """
+
+    user_id: str
+    oauth_consumer_key: Optional[str]
+    lis_result_sourcedid: Optional[str]
+    lis_outcome_service_url: Optional[str]
+    is_correct: Optional[bool]
+    attempt_type: str
+    created_at: datetime
+
+
+def intern_str(value: Optional[str]) -> Optional[str]:
+    """
+    Возвращает единственный экземпляр строки (sys.intern).
+    Повторяющиеся значения (пользователи, типы попыток, ключи, адреса заданий)
+    хранятся в памяти один раз на все записи. None возвращается как есть.
+    """
+    return sys.intern(value) if type(value) is str else value
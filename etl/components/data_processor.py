@@ -1,11 +1,29 @@
-from typing import Dict, Any, List, Tuple
-from datetime import datetime
-import ast
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
 import logging
-from .logger_configs import setup_logging
+import os
+from .logger_configs import setup_logging, RejectionSummary
+from .passback_parser import parse_passback_params
+from .hyperloglog import HyperLogLog, DEFAULT_PRECISION
+from .attempt_record import AttemptRecord, intern_str
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 setup_logging()
 
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+# Строки, которые datetime.strptime принимает в формате DATE_FORMAT.
+# pandas.to_datetime с тем же форматом допускает до 9 знаков в долях секунды,
+# поэтому колоночная обработка сначала проверяет строку по этому шаблону
+DATE_PATTERN = r"\d{4}-\d{1,2}-(?:\d{1,2}| \d)\s+\d{1,2}:\d{1,2}:\d{1,2}\.\d{1,6}"
+PASSBACK_FIELDS = [
+    "oauth_consumer_key",
+    "lis_result_sourcedid",
+    "lis_outcome_service_url",
+]
+
 
 class DataProcessor:
     """
@@ -15,41 +33,208 @@ class DataProcessor:
     _logger = logging.getLogger("DataProcessor")
 
     @staticmethod
-    def processing_attempts(attempts_data: List[Dict[str, Any]]) -> List[Tuple]:
+    def processing_attempts(
+        attempts_data: List[Dict[str, Any]],
+        start_index: int = 0,
+        rejections: Optional[Dict[str, int]] = None,
+        release_raw: bool = False,
+        summary: Optional[RejectionSummary] = None,
+    ) -> List[AttemptRecord]:
         """
-        Обрабатывает сырые данные из API и возвращает список кортежей для вставки в БД.
+        Обрабатывает сырые данные из API и возвращает список AttemptRecord для вставки в БД.
+        start_index - сквозной номер первой записи, если данные приходят пачками.
+        В rejections, если передан, добавляется количество пропущенных записей по причинам.
+        Пропущенные записи пишутся в лог сводкой: по несколько примеров на причину
+        и количество записей по каждой причине.
+        Если данные приходят пачками, в summary передается общая сводка
+        из rejection_summary(): пропуски всех пачек копятся в ней, и вызывающий
+        код один раз пишет ее в лог через summary.flush(). rejections тогда не нужен.
+        При release_raw=True каждая сырая запись удаляется из attempts_data сразу
+        после проверки, и в памяти не лежат одновременно все словари и все записи.
+        После обработки список attempts_data пуст.
         """
-        processed_attempts = []
         total_records = len(attempts_data)
 
         if total_records == 0:
             DataProcessor._logger.info("Нет данных для обработки.")
-            return processed_attempts
+            return []
 
         DataProcessor._logger.info(f"Начало обработки {total_records} записей.")
 
-        for i, attempt in enumerate(attempts_data):
+        processed_attempts, messages = DataProcessor._process_chunk(
+            attempts_data, start_index, release_raw
+        )
+        if release_raw:
+            attempts_data.clear()
+        if summary is None:
+            run_summary = RejectionSummary(DataProcessor._logger, counts=rejections)
+            DataProcessor._log_messages(messages, run_summary)
+            run_summary.flush()
+        else:
+            DataProcessor._log_messages(messages, summary)
+
+        DataProcessor._log_summary(total_records, len(processed_attempts))
+        return processed_attempts
+
+    @staticmethod
+    def rejection_summary(
+        rejections: Optional[Dict[str, int]] = None,
+    ) -> RejectionSummary:
+        """
+        Общая сводка пропущенных записей для нескольких вызовов processing_attempts.
+        После flush() количество пропусков по причинам добавляется в rejections.
+        """
+        return RejectionSummary(DataProcessor._logger, counts=rejections)
+
+    @staticmethod
+    def processing_attempts_parallel(
+        attempts_data: List[Dict[str, Any]],
+        workers: int = None,
+        chunk_size: int = 20000,
+        min_records: int = 100000,
+        rejections: Optional[Dict[str, int]] = None,
+        release_raw: bool = False,
+    ) -> List[AttemptRecord]:
+        """
+        Параллельная версия processing_attempts на ProcessPoolExecutor.
+        Данные делятся на части по chunk_size записей и валидируются в workers процессах
+        (по умолчанию - по числу ядер). Результаты и предупреждения собираются
+        в исходном порядке, номера записей в логах совпадают с последовательной версией.
+        Если записей меньше min_records, запуск процессов не окупается
+        и используется последовательная обработка.
+        rejections и release_raw - как в processing_attempts. Сырые записи
+        передаются процессам копиями, поэтому список очищается после обработки.
+        """
+        if chunk_size < 1:
+            error_msg = "chunk_size должен быть >= 1"
+            DataProcessor._logger.error(error_msg)
+            raise ValueError(error_msg)
+
+        total_records = len(attempts_data)
+        workers = workers or os.cpu_count() or 1
+
+        if total_records < min_records or workers < 2:
+            return DataProcessor.processing_attempts(
+                attempts_data, rejections=rejections, release_raw=release_raw
+            )
+
+        DataProcessor._logger.info(
+            f"Начало параллельной обработки {total_records} записей: "
+            f"процессов {workers}, размер части {chunk_size}."
+        )
+
+        offsets = range(0, total_records, chunk_size)
+        chunks = (attempts_data[offset : offset + chunk_size] for offset in offsets)
+
+        processed_attempts = []
+        summary = RejectionSummary(DataProcessor._logger, counts=rejections)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for processed_chunk, messages in executor.map(
+                DataProcessor._process_chunk, chunks, offsets
+            ):
+                # Строки записей из дочерних процессов приходят копиями,
+                # поэтому повторяющиеся значения интернируются заново
+                processed_attempts.extend(
+                    map(DataProcessor._intern_record, processed_chunk)
+                )
+                DataProcessor._log_messages(messages, summary)
+        summary.flush()
+        if release_raw:
+            attempts_data.clear()
+
+        DataProcessor._log_summary(total_records, len(processed_attempts))
+        return processed_attempts
+
+    @staticmethod
+    def _process_chunk(
+        attempts_data: List[Dict[str, Any]], start_index: int, release_raw: bool = False
+    ) -> Tuple[List[AttemptRecord], List[Tuple[str, int, str, Tuple]]]:
+        """
+        Валидирует часть записей без записи в лог, чтобы работать в дочерних процессах.
+        При release_raw=True проверенная запись заменяется в attempts_data на None.
+        Возвращает валидные записи и список сообщений
+        (причина пропуска, уровень логирования, шаблон текста, аргументы шаблона).
+        Текст собирается позже и только для сообщений, которые попадут в лог.
+        Используется только внутри класса DataProcessor.
+        """
+        processed_attempts = []
+        messages = []
+
+        for i, attempt in enumerate(attempts_data, start=start_index):
+            if release_raw:
+                attempts_data[i - start_index] = None
+
             try:
                 valid_attempt = DataProcessor._validate_attempt(attempt)
                 processed_attempts.append(valid_attempt)
 
             except ValueError as err:
-                DataProcessor._logger.warning(f"Пропущена запись {i + 1}: {err}")
+                error = str(err)
+                messages.append(
+                    (
+                        DataProcessor.rejection_reason(error),
+                        logging.WARNING,
+                        "Пропущена запись %d: %s",
+                        (i + 1, error),
+                    )
+                )
 
             except Exception as err:
-                DataProcessor._logger.error(
-                    f"Непредвиденная ошибка в записи {i + 1}: {repr(err)}."
+                messages.append(
+                    (
+                        f"Непредвиденная ошибка {type(err).__name__}",
+                        logging.ERROR,
+                        "Непредвиденная ошибка в записи %d: %s.",
+                        (i + 1, repr(err)),
+                    )
                 )
 
-        success_records = len(processed_attempts)
+        return processed_attempts, messages
+
+    @staticmethod
+    def _intern_record(record: AttemptRecord) -> AttemptRecord:
+        """
+        Интернирует повторяющиеся строки записи, как в _validate_attempt.
+        Используется только внутри класса DataProcessor.
+        """
+        return AttemptRecord(
+            intern_str(record.user_id),
+            intern_str(record.oauth_consumer_key),
+            record.lis_result_sourcedid,
+            intern_str(record.lis_outcome_service_url),
+            record.is_correct,
+            intern_str(record.attempt_type),
+            record.created_at,
+        )
+
+    @staticmethod
+    def _log_messages(
+        messages: List[Tuple[str, int, str, Tuple]], summary: RejectionSummary
+    ) -> None:
+        """
+        Добавляет в сводку сообщения, собранные в _process_chunk.
+        Используется только внутри класса DataProcessor.
+        """
+        for reason, level, msg, args in messages:
+            summary.add(reason, level, msg, *args)
+
+    @staticmethod
+    def rejection_reason(message: str) -> str:
+        """
+        Причина пропуска записи без подробностей конкретного значения:
+        "Неверный формат created_at: ..." -> "Неверный формат created_at".
+        """
+        return message.split(":", maxsplit=1)[0].rstrip(".")
+
+    @staticmethod
+    def _log_summary(total_records: int, success_records: int) -> None:
+        """Пишет в лог итог обработки."""
         DataProcessor._logger.info(
             f"Обработка завершена. Успешно: {success_records}, пропущено: {total_records - success_records}."
         )
 
-        return processed_attempts
-
     @staticmethod
-    def _validate_attempt(attempt: Dict[str, Any]) -> Tuple:
+    def _validate_attempt(attempt: Dict[str, Any]) -> AttemptRecord:
         """
         Обрабатывает и валидирует одну запись.
         Выбрасывает исключение ValueError, если запись невалидна.
@@ -89,13 +274,13 @@ class DataProcessor:
 
         # Парсинг даты
         try:
-            created_at = datetime.strptime(created_at_str, "%Y-%m-%d %H:%M:%S.%f")
+            created_at = datetime.strptime(created_at_str, DATE_FORMAT)
         except ValueError as err:
             raise ValueError(f"Неверный формат created_at: {err}.")
 
         # Парсинг passback_params
         try:
-            passback_dict = ast.literal_eval(passback_params_str)
+            passback_dict = parse_passback_params(passback_params_str)
         except (SyntaxError, ValueError) as err:
             raise ValueError(f"Ошибка парсинга passback_params: {repr(err)}.")
 
@@ -113,26 +298,224 @@ class DataProcessor:
             if not isinstance(param_value, str) and not param_value is None:
                 raise ValueError(f"{param_name} должен быть строкой или None")
 
-        # Возвращаем кортеж из валидных полей
-        return (
-            user_id,
-            oauth_consumer_key,
+        # Возвращаем запись из валидных полей, повторяющиеся строки - в одном экземпляре
+        return AttemptRecord(
+            intern_str(user_id),
+            intern_str(oauth_consumer_key),
             lis_result_sourcedid,
-            lis_outcome_service_url,
+            intern_str(lis_outcome_service_url),
             is_correct,
-            attempt_type,
+            intern_str(attempt_type),
             created_at,
         )
 
     @staticmethod
-    def get_cols() -> List[str]:
-        """Возвращает список с названиями столбцов."""
-        return [
-            "user_id",
-            "oauth_consumer_key",
-            "lis_result_sourcedid",
-            "lis_outcome_service_url",
-            "is_correct",
-            "attempt_type",
-            "created_at",
+    def processing_attempts_columnar(
+        attempts_data: List[Dict[str, Any]],
+        start_index: int = 0,
+        rejections: Optional[Dict[str, int]] = None,
+        release_raw: bool = False,
+    ) -> Tuple["pd.DataFrame", "pd.DataFrame"]:
+        """
+        Колоночная версия processing_attempts: проверки выполняются над столбцами целиком.
+        Возвращает кортеж из двух DataFrame:
+        - валидные записи со столбцами get_cols() и типизированными колонками;
+        - отклоненные записи со столбцами record (номер записи) и reason (причина).
+        Для каждой отклоненной записи указывается первая причина в том же порядке
+        проверок, что и в _validate_attempt.
+        rejections - как в processing_attempts. При release_raw=True список
+        attempts_data очищается сразу после переноса записей в DataFrame.
+        """
+        # pandas нужен только колоночной обработке, построчная его не загружает
+        import pandas as pd
+
+        total_records = len(attempts_data)
+        DataProcessor._logger.info(
+            f"Начало колоночной обработки {total_records} записей."
+        )
+
+        raw_df = pd.DataFrame(
+            attempts_data,
+            columns=[
+                "lti_user_id",
+                "attempt_type",
+                "is_correct",
+                "created_at",
+                "passback_params",
+            ],
+        )
+        raw_df.index = pd.RangeIndex(start_index + 1, start_index + 1 + total_records)
+        # В числовом столбце None из JSON стал бы NaN, а NaN не проходит проверку
+        # is_correct. Отсутствующее поле, как и в _validate_attempt, считается None
+        raw_df["is_correct"] = pd.Series(
+            [attempt.get("is_correct") for attempt in attempts_data],
+            index=raw_df.index,
+            dtype=object,
+        )
+        if release_raw:
+            attempts_data.clear()
+
+        user_id = raw_df["lti_user_id"]
+        attempt_type = raw_df["attempt_type"]
+        is_correct = raw_df["is_correct"]
+        created_at_str = raw_df["created_at"]
+        passback_str = raw_df["passback_params"]
+
+        def is_missing(col: pd.Series) -> pd.Series:
+            return col.isna() | col.eq("") | col.eq(0)
+
+        def is_str(col: pd.Series) -> pd.Series:
+            return col.map(type).eq(str)
+
+        def is_none(col: pd.Series) -> pd.Series:
+            # Как в _validate_attempt: NaN, в отличие от None, не пропускается
+            return col.map(lambda value: value is None)
+
+        # Парсинг даты только для строковых значений в формате DATE_FORMAT
+        created_at_is_str = is_str(created_at_str)
+        created_at_matches = created_at_str.where(created_at_is_str, "").str.fullmatch(
+            DATE_PATTERN
+        )
+        created_at = pd.to_datetime(
+            created_at_str.where(created_at_is_str & created_at_matches),
+            format=DATE_FORMAT,
+            errors="coerce",
+        )
+
+        # Парсинг passback_params: каждая уникальная строка разбирается один раз
+        passback_is_str = is_str(passback_str)
+        codes, uniques = pd.factorize(passback_str.where(passback_is_str))
+        parsed_fields = {field: [] for field in PASSBACK_FIELDS}
+        parse_errors = []
+
+        for value in uniques:
+            error = None
+            fields = dict.fromkeys(PASSBACK_FIELDS)
+            try:
+                passback_dict = parse_passback_params(value)
+                for field in PASSBACK_FIELDS:
+                    fields[field] = passback_dict.get(field)
+                    if not isinstance(fields[field], str) and fields[field] is not None:
+                        error = f"{field} должен быть строкой или None"
+                        break
+            except (SyntaxError, ValueError) as err:
+                error = f"Ошибка парсинга passback_params: {repr(err)}."
+            except Exception as err:
+                error = f"Непредвиденная ошибка: {repr(err)}."
+
+            parse_errors.append(error)
+            for field in PASSBACK_FIELDS:
+                parsed_fields[field].append(fields[field])
+
+        def take(values: List[Any]) -> pd.Series:
+            # codes == -1 для нестроковых значений, для них берем None
+            lookup = pd.Series(values + [None], dtype=object)
+            return pd.Series(lookup.to_numpy()[codes], index=raw_df.index, dtype=object)
+
+        passback_error = take(parse_errors)
+        passback_error = passback_error.mask(
+            ~passback_is_str,
+            "Ошибка парсинга passback_params: значение не является строкой.",
+        )
+
+        # Проверки в порядке _validate_attempt: побеждает первая сработавшая
+        checks = [
+            (is_missing(user_id), "Отсутствует user_id."),
+            (is_missing(attempt_type), "Отсутствует attempt_type."),
+            (is_missing(created_at_str), "Отсутствует created_at."),
+            (is_missing(passback_str), "Отсутствует passback_params."),
+            (~is_str(user_id), "user_id должен быть строкой."),
+            (
+                ~(is_none(is_correct) | is_correct.isin([0, 1])),
+                "is_correct должен быть 0, 1 или None.",
+            ),
+            (
+                ~attempt_type.isin(["run", "submit"]),
+                "attempt_type должен быть 'run' или 'submit'.",
+            ),
+            (created_at.isna(), "Неверный формат created_at."),
+            (passback_error.notna(), passback_error),
         ]
+
+        reason = pd.Series(None, index=raw_df.index, dtype=object)
+        for mask, message in checks:
+            reason = reason.mask(reason.isna() & mask, message)
+
+        valid = reason.isna()
+
+        attempts_df = pd.DataFrame(
+            {
+                "user_id": user_id[valid].astype(object),
+                **{
+                    field: take(parsed_fields[field])[valid]
+                    for field in PASSBACK_FIELDS
+                },
+                "is_correct": pd.arrays.BooleanArray(
+                    is_correct[valid].isin([1]).to_numpy(),
+                    is_none(is_correct[valid]).to_numpy(),
+                ),
+                "attempt_type": pd.Categorical(
+                    attempt_type[valid], categories=["run", "submit"]
+                ),
+                "created_at": created_at[valid],
+            },
+            columns=DataProcessor.get_cols(),
+        ).reset_index(drop=True)
+
+        rejected_df = (
+            reason[~valid].rename("reason").rename_axis("record").reset_index()
+        )
+
+        summary = RejectionSummary(DataProcessor._logger, counts=rejections)
+        for message, count in rejected_df["reason"].value_counts().items():
+            summary.add(
+                DataProcessor.rejection_reason(message),
+                logging.WARNING,
+                "Пропущено %d записей: %s",
+                count,
+                message,
+                count=count,
+            )
+        summary.flush()
+
+        DataProcessor._logger.info(
+            f"Обработка завершена. Успешно: {len(attempts_df)}, пропущено: {len(rejected_df)}."
+        )
+
+        return attempts_df, rejected_df
+
+    @staticmethod
+    def update_daily_sketches(
+        sketches: Dict[date, HyperLogLog],
+        processed_attempts: Union[List[AttemptRecord], "pd.DataFrame"],
+        precision: int = DEFAULT_PRECISION,
+    ) -> Dict[date, HyperLogLog]:
+        """
+        Добавляет user_id обработанных записей в дневные скетчи HyperLogLog.
+        Принимает записи из processing_attempts или DataFrame из processing_attempts_columnar.
+        Скетчи для новых дней создаются с точностью precision. Возвращает sketches.
+        """
+        # DataFrame распознается без импорта pandas: записи приходят списком
+        if not isinstance(processed_attempts, list):
+            day_users = processed_attempts.groupby(
+                processed_attempts["created_at"].dt.date
+            )["user_id"].unique()
+        else:
+            day_users = {}
+            for attempt in processed_attempts:
+                day_users.setdefault(attempt.created_at.date(), set()).add(
+                    attempt.user_id
+                )
+
+        # Каждый пользователь хэшируется один раз за день в пачке
+        for day, users in day_users.items():
+            if day not in sketches:
+                sketches[day] = HyperLogLog(precision)
+            sketches[day].update(users)
+
+        return sketches
+
+    @staticmethod
+    def get_cols() -> List[str]:
+        """Возвращает список с названиями столбцов (полями AttemptRecord)."""
+        return list(AttemptRecord._fields)
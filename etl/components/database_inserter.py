@@ -1,55 +1,248 @@
-from typing import List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from itertools import islice
+import io
 import logging
+import threading
+import time
 import psycopg2
-from psycopg2.extras import execute_batch
+from psycopg2 import sql
+from psycopg2.extras import execute_batch, execute_values
+from psycopg2.pool import ThreadedConnectionPool
 from .logger_configs import setup_logging
+from .hyperloglog import HyperLogLog
+from .attempt_record import AttemptRecord
+from .attempt_key_index import AttemptKey, AttemptKeyIndex
 
 setup_logging()
 
+DEFAULT_PARTITION = "attempts_default"
+
+ATTEMPTS_COLUMNS = ", ".join(AttemptRecord._fields)
+
+
+def _copy_value(value: Any) -> str:
+    """Форматирует значение для COPY в текстовом формате PostgreSQL."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
 
 class DatabaseInserter:
     """
     Класс для вставки обработанных данных в БД.
-    Написан по шаблону Singleton.
+    Соединения берутся из пула ThreadedConnectionPool, поэтому один объект
+    можно использовать из нескольких потоков. Транзакция, открытая методом
+    с commit=False, привязана к потоку: следующие вызовы в этом потоке
+    продолжают ее, commit() фиксирует и возвращает соединение в пул.
     """
 
-    def __new__(cls, *args, **kwargs):
-        if not hasattr(cls, "_instance"):
-            cls._instance = super().__new__(cls)
-        return cls._instance
+    def __init__(
+        self,
+        host: str,
+        port: str,
+        database: str,
+        user: str,
+        password: str,
+        min_connections: int = 1,
+        max_connections: int = 4,
+        health_check_interval: float = 30.0,
+    ):
+        self._logger = logging.getLogger("DatabaseInserter")
+        self._health_check_interval = health_check_interval
+        # Соединение открытой транзакции текущего потока
+        self._local = threading.local()
+        # getconn пула не ждет свободного соединения, ожидание - через семафор
+        self._slots = threading.BoundedSemaphore(max_connections)
+        # Время возврата соединения в пул, для проверки давно простаивающих
+        self._released_at: Dict[int, float] = {}
+        # Индекс ключей уже загруженных попыток, см. load_key_index
+        self._key_index: Optional[AttemptKeyIndex] = None
+        self._pool = None
 
-    def __init__(self, host: str, port: str, database: str, user: str, password: str):
-        if not hasattr(self, "_initialized"):
+        try:
+            self._logger.info("Установка подключения к БД...")
 
-            self._logger = logging.getLogger("DatabaseInserter")
+            self._pool = ThreadedConnectionPool(
+                min_connections,
+                max_connections,
+                host=host,
+                port=port,
+                database=database,
+                user=user,
+                password=password,
+            )
 
-            try:
-                self._logger.info("Установка подключения к БД...")
+            self._logger.info(
+                f"Подключение к БД установлено, размер пула: {min_connections}-{max_connections}."
+            )
 
-                self._connection = psycopg2.connect(
-                    host=host,
-                    port=port,
-                    database=database,
-                    user=user,
-                    password=password,
-                )
-                self._initialized = True
+        except psycopg2.Error as err:
+            self._logger.error(f"Ошибка подключения к БД: {repr(err)}.")
+            raise
+
+    def _is_alive(self, connection: Any) -> bool:
+        """
+        Проверка соединения перед выдачей из пула. Закрытое соединение
+        отбраковывается сразу, простаивавшее дольше health_check_interval
+        проверяется запросом SELECT 1.
+        Используется только внутри класса DatabaseInserter.
+        """
+        if connection.closed:
+            return False
+
+        # Новое соединение пул только что открыл, оно не проверяется
+        released_at = self._released_at.get(id(connection))
+        if (
+            released_at is None
+            or time.monotonic() - released_at < self._health_check_interval
+        ):
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
 
-                self._logger.info("Подключение к БД установлено.")
+    def _checkout(self) -> Any:
+        """
+        Берет соединение из пула, при необходимости ждет свободного.
+        Разорванные соединения закрываются, вместо них пул открывает новые.
+        Используется только внутри класса DatabaseInserter.
+        """
+        self._slots.acquire()
+        try:
+            # Все соединения пула могут оказаться разорванными, например после
+            # перезапуска БД: каждое проверяется не больше одного раза
+            for _ in range(self._pool.maxconn + 1):
+                connection = self._pool.getconn()
+                if self._is_alive(connection):
+                    return connection
 
-            except psycopg2.Error as err:
-                self._logger.error(f"Ошибка подключения к БД: {repr(err)}.")
-                raise
+                self._logger.warning("Соединение с БД разорвано, переподключаемся.")
+                self._released_at.pop(id(connection), None)
+                self._pool.putconn(connection, close=True)
+
+            raise psycopg2.OperationalError(
+                "Не удалось получить рабочее соединение с БД"
+            )
+
+        except BaseException:
+            self._slots.release()
+            raise
 
-    def insert_attempts(self, processed_attempts: List[Tuple]) -> None:
+    def _release(self, connection: Any) -> None:
+        """
+        Возвращает соединение в пул. Разорванное соединение закрывается.
+        Используется только внутри класса DatabaseInserter.
+        """
+        if connection.closed:
+            self._released_at.pop(id(connection), None)
+        else:
+            self._released_at[id(connection)] = time.monotonic()
+        try:
+            self._pool.putconn(connection, close=bool(connection.closed))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Выдает соединение для запросов. Если в потоке открыта транзакция,
+        выдается ее соединение. Иначе соединение берется из пула на время блока:
+        при выходе транзакция фиксируется (при ошибке - откатывается),
+        а соединение возвращается в пул.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            yield connection
+            return
+
+        connection = self._checkout()
+        try:
+            yield connection
+            connection.commit()
+        except BaseException:
+            if not connection.closed:
+                connection.rollback()
+            raise
+        finally:
+            self._release(connection)
+
+    @contextmanager
+    def transaction(self, commit: bool = True) -> Iterator[Any]:
+        """
+        Выдает соединение транзакции текущего потока, открывая ее при необходимости.
+        При ошибке транзакция откатывается. commit=True фиксирует ее при выходе
+        из блока, при commit=False она остается открытой до commit() или rollback().
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._checkout()
+            self._local.connection = connection
+
+        try:
+            yield connection
+        except BaseException:
+            self.rollback()
+            raise
+
+        if commit:
+            self.commit()
+
+    def insert_attempts(
+        self, processed_attempts: List[Tuple], commit: bool = True
+    ) -> None:
         """
         Метод вставляет попытки студентов в базу данных.
+        При commit=False транзакция остается открытой до вызова commit().
         Ничего не возвращает.
         """
         if not processed_attempts:
             self._logger.info("Нет данных для вставки.")
             return
 
+        self._execute_insert(processed_attempts, len(processed_attempts), commit)
+
+    def insert_attempts_frame(self, attempts_df: Any, commit: bool = True) -> None:
+        """
+        Метод вставляет в базу данных DataFrame из processing_attempts_columnar.
+        Строки формируются лениво, пропуски (NA/NaT) передаются как NULL.
+        Ничего не возвращает.
+        """
+        if len(attempts_df) == 0:
+            self._logger.info("Нет данных для вставки.")
+            return
+
+        rows = (
+            attempts_df.astype(object)
+            .where(attempts_df.notna(), None)
+            .itertuples(index=False, name=None)
+        )
+        self._execute_insert(rows, len(attempts_df), commit)
+
+    def _execute_insert(
+        self, rows: Iterable[Tuple], rows_cnt: int, commit: bool = True
+    ) -> None:
+        """
+        Выполняет вставку строк одной транзакцией.
+        Используется только внутри класса DatabaseInserter.
+        """
+        rows, counts = self._skip_known(rows)
         query = """
         INSERT INTO attempts (
             user_id,
@@ -64,25 +257,608 @@ class DatabaseInserter:
         ON CONFLICT ON CONSTRAINT unique_attempt DO NOTHING
         """
         try:
-            self._logger.info(f"Начало вставки {len(processed_attempts)} записей в БД.")
+            self._logger.info(f"Начало вставки {rows_cnt} записей в БД.")
 
-            with self._connection.cursor() as cursor:
-                execute_batch(cursor, query, processed_attempts)
-                self._connection.commit()
+            with self.transaction(commit) as connection, connection.cursor() as cursor:
+                execute_batch(cursor, query, rows)
 
             self._logger.info("Записи успешно вставлены.")
+            self._log_skipped(counts)
 
         except psycopg2.Error as err:
             self._logger.error(f"Ошибка при вставке данных: {repr(err)}.")
-            self._logger.info("Откат транзакции...")
-            self._connection.rollback()
             raise
 
+    def copy_attempts(
+        self,
+        processed_attempts: Iterable[Tuple],
+        chunk_rows: int = 100000,
+        commit: bool = True,
+    ) -> Dict[str, int]:
+        """
+        Быстрая загрузка через COPY: строки частями по chunk_rows копируются
+        во временную таблицу attempts_staging, затем одним запросом
+        INSERT ... SELECT ... ON CONFLICT DO NOTHING переносятся в attempts.
+        При commit=False транзакция остается открытой до вызова commit().
+        Возвращает словарь с количеством загруженных (staged),
+        вставленных (inserted) и дублирующих (duplicates) записей.
+        """
+        staging_query = f"""
+        CREATE TEMP TABLE attempts_staging ON COMMIT DROP AS
+        SELECT {ATTEMPTS_COLUMNS} FROM attempts WITH NO DATA
+        """
+        copy_query = f"COPY attempts_staging ({ATTEMPTS_COLUMNS}) FROM STDIN"
+        merge_query = f"""
+        INSERT INTO attempts ({ATTEMPTS_COLUMNS})
+        SELECT {ATTEMPTS_COLUMNS} FROM attempts_staging
+        ON CONFLICT ON CONSTRAINT unique_attempt DO NOTHING
+        """
+        rows, skip_counts = self._skip_known(processed_attempts)
+        staged_cnt = 0
+
+        try:
+            self._logger.info("Начало загрузки записей в БД через COPY.")
+
+            with self.transaction(commit) as connection, connection.cursor() as cursor:
+                cursor.execute(staging_query)
+
+                while True:
+                    chunk = list(islice(rows, chunk_rows))
+                    if not chunk:
+                        break
+
+                    buffer = io.StringIO()
+                    for row in chunk:
+                        buffer.write("\t".join(map(_copy_value, row)))
+                        buffer.write("\n")
+                    buffer.seek(0)
+
+                    cursor.copy_expert(copy_query, buffer)
+                    staged_cnt += len(chunk)
+
+                cursor.execute(merge_query)
+                inserted_cnt = cursor.rowcount
+                cursor.execute("DROP TABLE attempts_staging")
+
+            counts = {
+                "staged": staged_cnt,
+                "inserted": inserted_cnt,
+                "duplicates": staged_cnt - inserted_cnt,
+            }
+            self._logger.info(
+                f"Загружено через COPY: {staged_cnt}, вставлено: {inserted_cnt}, "
+                f"дубликатов: {counts['duplicates']}."
+            )
+            self._log_skipped(skip_counts)
+            return counts
+
+        except psycopg2.Error as err:
+            self._logger.error(f"Ошибка при загрузке данных через COPY: {repr(err)}.")
+            raise
+
+    def copy_attempts_frame(
+        self, attempts_df: Any, commit: bool = True
+    ) -> Dict[str, int]:
+        """
+        Загрузка через COPY для DataFrame из processing_attempts_columnar.
+        Возвращает то же, что и copy_attempts.
+        """
+        rows = (
+            attempts_df.astype(object)
+            .where(attempts_df.notna(), None)
+            .itertuples(index=False, name=None)
+        )
+        return self.copy_attempts(rows, commit=commit)
+
+    def load_key_index(
+        self, start: Any, end: Any, bloom_error: Optional[float] = None
+    ) -> AttemptKeyIndex:
+        """
+        Загружает ключи (user_id, attempt_type, created_at) попыток за период
+        [start, end] в индекс AttemptKeyIndex. Дальше все вставки пропускают
+        записи, которые уже есть в БД, и не передают их на сервер.
+        С bloom_error индекс - фильтр Блума с такой долей ложных срабатываний,
+        размер которого рассчитывается по количеству попыток за период.
+        Возвращает индекс, в нем же накапливаются счетчики новых и пропущенных записей.
+        """
+        count_query = """
+        SELECT count(*) FROM attempts WHERE created_at BETWEEN %s AND %s
+        """
+        keys_query = """
+        SELECT user_id, attempt_type, created_at
+        FROM attempts
+        WHERE created_at BETWEEN %s AND %s
+        """
+        try:
+            self._logger.info(f"Загрузка ключей попыток за период {start} - {end}...")
+
+            with self.connection() as connection:
+                if bloom_error is not None:
+                    with connection.cursor() as cursor:
+                        cursor.execute(count_query, (start, end))
+                        capacity = cursor.fetchone()[0]
+                    key_index = AttemptKeyIndex(capacity, bloom_error)
+                else:
+                    key_index = AttemptKeyIndex()
+
+                # Серверный курсор: ключи читаются частями, а не все сразу
+                with connection.cursor(name="attempt_keys") as cursor:
+                    cursor.itersize = 100000
+                    cursor.execute(keys_query, (start, end))
+                    key_index.update(cursor)
+
+            self._key_index = key_index
+            self._logger.info(
+                f"Загружено ключей: {key_index.keys_cnt}, "
+                f"{'фильтр Блума' if key_index.is_bloom else 'точный индекс'}, "
+                f"~{key_index.size_bytes / 1024 / 1024:.1f} МБ."
+            )
+            return key_index
+
+        except psycopg2.Error as err:
+            self._logger.error(f"Ошибка при загрузке ключей попыток: {repr(err)}.")
+            raise
+
+    def _skip_known(
+        self, rows: Iterable[Tuple]
+    ) -> Tuple[Iterable[Tuple], Dict[str, int]]:
+        """
+        Убирает из строк уже загруженные попытки, если загружен индекс ключей.
+        Возвращает строки и словарь счетчиков, который заполняется по мере чтения строк.
+        Используется только внутри класса DatabaseInserter.
+        """
+        counts: Dict[str, int] = {}
+        if self._key_index is None:
+            return iter(rows), counts
+
+        return (
+            self._key_index.filter(
+                rows, verify=self._find_existing_keys, counts=counts
+            ),
+            counts,
+        )
+
+    def _find_existing_keys(self, keys: List[AttemptKey]) -> List[AttemptKey]:
+        """
+        Возвращает ключи из keys, которые уже есть в attempts.
+        Проверяет срабатывания фильтра Блума в текущей транзакции потока.
+        Используется только внутри класса DatabaseInserter.
+        """
+        query = """
+        SELECT a.user_id, a.attempt_type, a.created_at
+        FROM attempts AS a
+        JOIN (VALUES %s) AS k (user_id, attempt_type, created_at)
+            ON a.user_id = k.user_id
+            AND a.attempt_type = k.attempt_type
+            AND a.created_at = k.created_at
+        """
+        with self.connection() as connection, connection.cursor() as cursor:
+            return execute_values(
+                cursor,
+                query,
+                keys,
+                template="(%s, %s, %s::timestamp)",
+                page_size=len(keys),
+                fetch=True,
+            )
+
+    def _log_skipped(self, counts: Dict[str, int]) -> None:
+        """
+        Пишет в лог, сколько записей пропущено по индексу ключей.
+        Используется только внутри класса DatabaseInserter.
+        """
+        if counts.get("existing"):
+            self._logger.info(
+                f"Пропущено уже загруженных записей: {counts['existing']}, "
+                f"новых: {counts.get('new', 0)}."
+            )
+
+    def ensure_partitions(
+        self, start: Any, end: Any, months_ahead: int = 1
+    ) -> List[str]:
+        """
+        Менеджер партиций: создает месячные партиции attempts_yYYYYmMM для периода
+        [start, end] и еще months_ahead месяцев вперед, чтобы вставка не попадала
+        в партицию по умолчанию. Если в партиции по умолчанию уже есть записи за месяц,
+        они переносятся в новую партицию. Для непартиционированной таблицы ничего не делает.
+        Возвращает список созданных партиций.
+        """
+        months_query = """
+        SELECT generate_series(
+            date_trunc('month', %s::timestamp),
+            date_trunc('month', %s::timestamp) + make_interval(months => %s),
+            interval '1 month'
+        )::date
+        """
+        created_partitions = []
+
+        try:
+            with self.transaction() as connection, connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT relkind FROM pg_class WHERE oid = to_regclass('attempts')"
+                )
+                row = cursor.fetchone()
+                if row is None or row[0] != "p":
+                    self._logger.info("Таблица attempts не партиционирована.")
+                    return created_partitions
+
+                cursor.execute("SELECT to_regclass(%s)", (DEFAULT_PARTITION,))
+                has_default = cursor.fetchone()[0] is not None
+
+                cursor.execute(months_query, (start, end, months_ahead))
+                for (month_start,) in cursor.fetchall():
+                    name = f"attempts_y{month_start:%Y}m{month_start:%m}"
+                    cursor.execute("SELECT to_regclass(%s)", (name,))
+                    if cursor.fetchone()[0] is not None:
+                        continue
+
+                    month_end = (month_start + timedelta(days=32)).replace(day=1)
+                    bounds = (month_start.isoformat(), month_end.isoformat())
+                    self._create_partition(cursor, name, bounds, has_default)
+                    created_partitions.append(name)
+
+            if created_partitions:
+                self._logger.info(f"Созданы партиции: {', '.join(created_partitions)}.")
+            return created_partitions
+
+        except psycopg2.Error as err:
+            self._logger.error(f"Ошибка при создании партиций: {repr(err)}.")
+            raise
+
+    @staticmethod
+    def _create_partition(
+        cursor: Any, name: str, bounds: Tuple[str, str], has_default: bool
+    ) -> None:
+        """
+        Создает месячную партицию. Записи этого месяца из партиции по умолчанию
+        переносятся в нее, иначе PostgreSQL не даст создать партицию.
+        Используется только внутри класса DatabaseInserter.
+        """
+        partition = sql.Identifier(name)
+        default_partition = sql.Identifier(DEFAULT_PARTITION)
+        month_start, month_end = map(sql.Literal, bounds)
+
+        moving_rows = False
+        if has_default:
+            cursor.execute(
+                sql.SQL(
+                    "SELECT EXISTS (SELECT 1 FROM {} WHERE created_at >= {} AND created_at < {})"
+                ).format(default_partition, month_start, month_end)
+            )
+            moving_rows = cursor.fetchone()[0]
+
+        if not moving_rows:
+            cursor.execute(
+                sql.SQL(
+                    "CREATE TABLE {} PARTITION OF attempts FOR VALUES FROM ({}) TO ({})"
+                ).format(partition, month_start, month_end)
+            )
+            return
+
+        cursor.execute(
+            sql.SQL(
+                "CREATE TABLE {} (LIKE attempts INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            ).format(partition)
+        )
+        cursor.execute(
+            sql.SQL("""
+                WITH moved AS (
+                    DELETE FROM {default_partition}
+                    WHERE created_at >= {month_start} AND created_at < {month_end}
+                    RETURNING *
+                )
+                INSERT INTO {partition} SELECT * FROM moved
+                """).format(
+                default_partition=default_partition,
+                month_start=month_start,
+                month_end=month_end,
+                partition=partition,
+            )
+        )
+        cursor.execute(
+            sql.SQL(
+                "ALTER TABLE attempts ATTACH PARTITION {} FOR VALUES FROM ({}) TO ({})"
+            ).format(partition, month_start, month_end)
+        )
+
+    def get_daily_stats(self, start: Any, end: Any) -> List[Tuple]:
+        """
+        Считает статистику по дням за период [start, end] одним запросом к attempts.
+        Столбцы совпадают с GoogleSheetsReporter.STATS_HEADERS: дата, всего попыток,
+        уникальные пользователи, успешные попытки, (%) успешных, run и submit.
+        """
+        query = """
+        SELECT
+            to_char(created_at::date, 'YYYY-MM-DD') AS dt,
+            count(*) AS total_attempts,
+            count(DISTINCT user_id) AS unique_users,
+            count(*) FILTER (WHERE is_correct) AS successful_attempts,
+            coalesce(
+                round(
+                    100.0 * count(*) FILTER (WHERE is_correct)
+                    / nullif(count(*) FILTER (WHERE attempt_type = 'submit'), 0),
+                    2
+                ),
+                0
+            )::float8 AS success_rate,
+            count(*) FILTER (WHERE attempt_type = 'run') AS run_cnt,
+            count(*) FILTER (WHERE attempt_type = 'submit') AS submit_cnt
+        FROM attempts
+        WHERE created_at BETWEEN %s AND %s
+        GROUP BY dt
+        ORDER BY dt
+        """
+        try:
+            with self.connection() as connection, connection.cursor() as cursor:
+                cursor.execute(query, (start, end))
+                stats_rows = cursor.fetchall()
+
+            self._logger.info(f"Посчитана статистика в БД за {len(stats_rows)} дн.")
+            return stats_rows
+
+        except psycopg2.Error as err:
+            self._logger.error(f"Ошибка при подсчете статистики: {repr(err)}.")
+            raise
+
+    def refresh_daily_rollups(self, start: Any, end: Any, commit: bool = True) -> None:
+        """
+        Пересчитывает дневные витрины daily_attempt_stats и daily_attempt_type_stats
+        для дней, которые затрагивает период [start, end]. Дни пересчитываются целиком,
+        поэтому частичная (инкрементальная) загрузка дня тоже дает верные итоги.
+        При commit=False пересчет фиксируется вместе с открытой транзакцией вставки.
+        """
+        days_filter = """
+        WHERE created_at >= %(start)s::date
+            AND created_at < %(end)s::date + 1
+        """
+        daily_query = f"""
+        INSERT INTO daily_attempt_stats (
+            dt, attempts_cnt, dau, correct_cnt, incorrect_cnt, run_cnt, submit_cnt, updated_at
+        )
+        SELECT
+            created_at::date AS dt,
+            count(*),
+            count(DISTINCT user_id),
+            count(*) FILTER (WHERE is_correct),
+            count(*) FILTER (WHERE NOT is_correct),
+            count(*) FILTER (WHERE attempt_type = 'run'),
+            count(*) FILTER (WHERE attempt_type = 'submit'),
+            now()
+        FROM attempts
+        {days_filter}
+        GROUP BY dt
+        ON CONFLICT (dt) DO UPDATE SET
+            attempts_cnt = EXCLUDED.attempts_cnt,
+            dau = EXCLUDED.dau,
+            correct_cnt = EXCLUDED.correct_cnt,
+            incorrect_cnt = EXCLUDED.incorrect_cnt,
+            run_cnt = EXCLUDED.run_cnt,
+            submit_cnt = EXCLUDED.submit_cnt,
+            updated_at = EXCLUDED.updated_at
+        """
+        type_query = f"""
+        INSERT INTO daily_attempt_type_stats (
+            dt, attempt_type, attempts_cnt, users_cnt, correct_cnt, incorrect_cnt, updated_at
+        )
+        SELECT
+            created_at::date AS dt,
+            attempt_type,
+            count(*),
+            count(DISTINCT user_id),
+            count(*) FILTER (WHERE is_correct),
+            count(*) FILTER (WHERE NOT is_correct),
+            now()
+        FROM attempts
+        {days_filter}
+        GROUP BY dt, attempt_type
+        ON CONFLICT (dt, attempt_type) DO UPDATE SET
+            attempts_cnt = EXCLUDED.attempts_cnt,
+            users_cnt = EXCLUDED.users_cnt,
+            correct_cnt = EXCLUDED.correct_cnt,
+            incorrect_cnt = EXCLUDED.incorrect_cnt,
+            updated_at = EXCLUDED.updated_at
+        """
+        params = {"start": start, "end": end}
+        try:
+            with self.transaction(commit) as connection, connection.cursor() as cursor:
+                cursor.execute(daily_query, params)
+                days_cnt = cursor.rowcount
+                cursor.execute(type_query, params)
+
+            self._logger.info(f"Дневные витрины пересчитаны за {days_cnt} дн.")
+
+        except psycopg2.Error as err:
+            self._logger.error(f"Ошибка при пересчете дневных витрин: {repr(err)}.")
+            raise
+
+    def merge_user_sketches(
+        self, sketches: Dict[date, HyperLogLog], commit: bool = True
+    ) -> None:
+        """
+        Объединяет дневные скетчи уникальных пользователей с сохраненными
+        в таблице daily_user_sketches. Повторная загрузка тех же данных
+        скетч не меняет, поэтому частичные загрузки дня можно объединять.
+        При commit=False объединение фиксируется вместе с открытой транзакцией вставки.
+        """
+        if not sketches:
+            return
+
+        select_query = """
+        SELECT dt, precision, registers
+        FROM daily_user_sketches
+        WHERE dt = ANY(%s)
+        FOR UPDATE
+        """
+        upsert_query = """
+        INSERT INTO daily_user_sketches (dt, precision, registers, updated_at)
+        VALUES (%s, %s, %s, now())
+        ON CONFLICT (dt) DO UPDATE SET
+            precision = EXCLUDED.precision,
+            registers = EXCLUDED.registers,
+            updated_at = EXCLUDED.updated_at
+        """
+        try:
+            with self.transaction(commit) as connection, connection.cursor() as cursor:
+                cursor.execute(select_query, (list(sketches),))
+                merged = {
+                    day: HyperLogLog(sketch.precision, sketch.registers)
+                    for day, sketch in sketches.items()
+                }
+                for day, precision, registers in cursor.fetchall():
+                    merged[day].merge(HyperLogLog.from_bytes(precision, registers))
+
+                execute_batch(
+                    cursor,
+                    upsert_query,
+                    [
+                        (day, sketch.precision, psycopg2.Binary(sketch.to_bytes()))
+                        for day, sketch in merged.items()
+                    ],
+                )
+
+            self._logger.info(f"Скетчи пользователей обновлены за {len(merged)} дн.")
+
+        except psycopg2.Error as err:
+            self._logger.error(f"Ошибка при обновлении скетчей: {repr(err)}.")
+            raise
+
+    def get_unique_users(self, start: Any, end: Any, exact: bool = False) -> int:
+        """
+        Возвращает количество уникальных пользователей за дни периода [start, end].
+        По умолчанию объединяет дневные скетчи из daily_user_sketches (приблизительно,
+        без чтения attempts). exact=True считает count(DISTINCT user_id) по attempts,
+        это нужно для проверки точности скетчей.
+        """
+        try:
+            with self.connection() as connection, connection.cursor() as cursor:
+                if exact:
+                    cursor.execute(
+                        """
+                        SELECT count(DISTINCT user_id)
+                        FROM attempts
+                        WHERE created_at >= %s::date AND created_at < %s::date + 1
+                        """,
+                        (start, end),
+                    )
+                    return cursor.fetchone()[0]
+
+                cursor.execute(
+                    """
+                    SELECT precision, registers
+                    FROM daily_user_sketches
+                    WHERE dt BETWEEN %s::date AND %s::date
+                    """,
+                    (start, end),
+                )
+                rows = cursor.fetchall()
+
+        except psycopg2.Error as err:
+            self._logger.error(
+                f"Ошибка при подсчете уникальных пользователей: {repr(err)}."
+            )
+            raise
+
+        if not rows:
+            return 0
+
+        sketch = HyperLogLog.from_bytes(*rows[0])
+        for precision, registers in rows[1:]:
+            sketch.merge(HyperLogLog.from_bytes(precision, registers))
+        return sketch.count()
+
+    def get_watermark(self, name: str = "attempts") -> Optional[datetime]:
+        """
+        Возвращает водяной знак загрузки: момент, до которого данные уже загружены.
+        Берется из таблицы etl_state, если его там нет - max(created_at) из attempts.
+        Возвращает None, если данных нет совсем.
+        """
+        try:
+            with self.connection() as connection, connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT watermark FROM etl_state WHERE name = %s", (name,)
+                )
+                row = cursor.fetchone()
+
+                if row is None:
+                    self._logger.info(
+                        f"Водяной знак {name} не найден, берем max(created_at)."
+                    )
+                    cursor.execute("SELECT max(created_at) FROM attempts")
+                    row = cursor.fetchone()
+
+            return row[0]
+
+        except psycopg2.Error as err:
+            self._logger.error(f"Ошибка при чтении водяного знака: {repr(err)}.")
+            raise
+
+    def set_watermark(
+        self, watermark: datetime, name: str = "attempts", commit: bool = True
+    ) -> None:
+        """
+        Сохраняет водяной знак загрузки в таблицу etl_state.
+        Водяной знак только сдвигается вперед: более ранний не записывается.
+        При commit=False он фиксируется вместе с открытой транзакцией вставки.
+        """
+        query = """
+        INSERT INTO etl_state (name, watermark, updated_at)
+        VALUES (%s, %s, now())
+        ON CONFLICT (name) DO UPDATE
+        SET watermark = GREATEST(etl_state.watermark, EXCLUDED.watermark),
+            updated_at = EXCLUDED.updated_at
+        """
+        try:
+            with self.transaction(commit) as connection, connection.cursor() as cursor:
+                cursor.execute(query, (name, watermark))
+
+            self._logger.info(f"Водяной знак {name} сдвинут до {watermark}.")
+
+        except psycopg2.Error as err:
+            self._logger.error(f"Ошибка при сохранении водяного знака: {repr(err)}.")
+            raise
+
+    def commit(self) -> None:
+        """
+        Фиксирует открытую транзакцию текущего потока (после вызовов с commit=False)
+        и возвращает ее соединение в пул.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            return
+
+        try:
+            connection.commit()
+        except psycopg2.Error as err:
+            self._logger.error(f"Ошибка при фиксации транзакции: {repr(err)}.")
+            if not connection.closed:
+                connection.rollback()
+            raise
+        finally:
+            self._local.connection = None
+            self._release(connection)
+
+    def rollback(self) -> None:
+        """Откатывает открытую транзакцию текущего потока и возвращает соединение в пул."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            return
+
+        self._logger.info("Откат транзакции...")
+        try:
+            if not connection.closed:
+                connection.rollback()
+        except psycopg2.Error as err:
+            self._logger.error(f"Ошибка при откате транзакции: {repr(err)}.")
+        finally:
+            self._local.connection = None
+            self._release(connection)
+
     def close_connection(self) -> None:
-        """Закрывает соединение с БД"""
-        if hasattr(self, "_connection") and not self._connection.closed:
-            self._connection.close()
-            self._logger.info("Соединение с БД закрыто.")
+        """Закрывает все соединения пула."""
+        pool = getattr(self, "_pool", None)
+        if pool is not None and not pool.closed:
+            pool.closeall()
+            self._logger.info("Соединения с БД закрыты.")
 
     def __del__(self):
         self.close_connection()
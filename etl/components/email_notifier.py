@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 import logging
 from datetime import timedelta
 import smtplib
@@ -36,13 +36,31 @@ class EmailNotifier:
         sheets_url: str,
         dashboard_url: str,
         exec_time: timedelta = None,
+        stages_summary: str = None,
+        failed_steps: Dict[str, str] = None,
     ) -> None:
         """
         Отправка отчета по email об успешном выполнении.
+        stages_summary - разбивка времени по этапам (RunReport.format_stages).
+        failed_steps - ошибки этапов после загрузки в БД (например, Google Sheets):
+        данные уже сохранены, поэтому запуск считается успешным с ошибками.
         Метод ничего не возвращает.
         """
 
-        subject = "✅ Отчет о обработке данных LMS - УСПЕХ"
+        failed_steps = failed_steps or {}
+        status = "УСПЕХ" if not failed_steps else "УСПЕХ С ОШИБКАМИ"
+        subject = f"{'✅' if not failed_steps else '⚠️'} Отчет о обработке данных LMS - {status}"
+        sheets_str = (
+            f"❌ Статистика не отправлена в Google Sheets: {failed_steps['sheets']}\n"
+            if "sheets" in failed_steps
+            else "✅ Статистика отправлена в Google Sheets!\n"
+        )
+        # Ошибка Google Sheets уже указана в строке выше
+        failed_str = "".join(
+            f"❌ {name}: {error}\n"
+            for name, error in failed_steps.items()
+            if name != "sheets"
+        )
 
         # Убираем микросекунды для время выполнения
         exec_time_str = (
@@ -57,12 +75,59 @@ class EmailNotifier:
             f"✅ Обработано записей: {processed_records_cnt}.\n"
             f"⚠️ Пропущено записей: {api_records_cnt - processed_records_cnt}.\n"
             "✅ Записи успешно вставлены в БД!\n"
-            "✅ Статистика отправлена в Google Sheets!\n"
+            f"{sheets_str}"
+            f"{failed_str}"
             f"📈 Ссылка на Google Sheets: {sheets_url}\n"
             f"📉 Ссылка на Дашборд: {dashboard_url}\n"
             "\n"
             f"⏱ Время выполнения: {exec_time_str}\n"
-            "🕐 Следующий запуск через 24 часа...\n"
+            + (f"\n⏱ Этапы:\n{stages_summary}\n\n" if stages_summary else "")
+            + "🕐 Следующий запуск через 24 часа...\n"
+            "\n"
+            "---------------\n"
+            "Автоматическое сообщение от системы мониторинга LMS."
+        )
+
+        return self._send_email(subject, body)
+
+    def send_backfill_report(
+        self,
+        date_from: str,
+        date_to: str,
+        done_days: List[str],
+        failed_days: Dict[str, str],
+        api_records_cnt: int,
+        processed_records_cnt: int,
+        exec_time: timedelta = None,
+    ) -> None:
+        """
+        Отправка одного итогового отчета по email о загрузке истории за период.
+        Метод ничего не возвращает.
+        """
+
+        status = "УСПЕХ" if not failed_days else "ЕСТЬ ОШИБКИ"
+        subject = f"{'✅' if not failed_days else '⚠️'} Загрузка истории LMS - {status}"
+
+        exec_time_str = (
+            str(exec_time).split(".", maxsplit=1)[0] if exec_time else "неизвестно"
+        )
+        failed_str = "".join(
+            f"❌ {day}: {error}\n" for day, error in sorted(failed_days.items())
+        )
+
+        body = (
+            f"Загрузка истории за период {date_from} - {date_to} завершена.\n"
+            "\n"
+            "📊 Статистика загрузки:\n"
+            f"✅ Загружено дней в этом запуске: {len(done_days)}.\n"
+            f"❌ Дней с ошибками: {len(failed_days)}.\n"
+            f"✅ Получено записей из API: {api_records_cnt}.\n"
+            f"✅ Обработано записей: {processed_records_cnt}.\n"
+            f"⚠️ Пропущено записей: {api_records_cnt - processed_records_cnt}.\n"
+            f"{failed_str}"
+            "\n"
+            f"⏱ Время выполнения: {exec_time_str}\n"
+            "🔁 Дни с ошибками будут загружены при повторном запуске.\n"
             "\n"
             "---------------\n"
             "Автоматическое сообщение от системы мониторинга LMS."
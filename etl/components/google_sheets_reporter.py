@@ -1,5 +1,8 @@
-from typing import List, Tuple, Dict, Any
+from typing import Callable, Iterator, List, Optional, Tuple, Dict, Any, Union
+from contextlib import contextmanager
 import logging
+import random
+import time
 import pandas as pd
 import numpy as np
 import gspread
@@ -9,14 +12,47 @@ from .logger_configs import setup_logging
 
 setup_logging()
 
+# Коды ответа Google Sheets API, при которых запрос повторяется: квота и сбои сервера
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
 
 class GoogleSheetsReporter:
     """
     Класс для записи статистики в Google Sheets.
+    Строка каждой даты в таблице одна: статистика за уже записанную дату
+    перезаписывается, за новую - добавляется в конец. Индекс дат читается
+    из таблицы один раз, все строки записываются одним запросом batch_update.
+    timeout - предельное время одного запроса к Google Sheets API в секундах.
     """
 
-    def __init__(self, credentials_dict: Dict[str, Any], spreadsheet_id: str):
+    STATS_HEADERS = [
+        "Дата",
+        "Всего попыток",
+        "Уникальные пользователи",
+        "Успешные попытки",
+        "(%) успешных попыток",
+        "Запускали код",
+        "Проверяли код",
+    ]
+
+    def __init__(
+        self,
+        credentials_dict: Dict[str, Any],
+        spreadsheet_id: str,
+        retries: int = 5,
+        backoff: float = 1.0,
+        timeout: float = 60.0,
+    ):
         self._logger = logging.getLogger("GoogleSheetsReporter")
+        self._retries = retries
+        self._backoff = backoff
+
+        # Номер строки для каждой даты, читается из таблицы при первой записи
+        self._date_rows: Optional[Dict[str, int]] = None
+        self._next_row = 2
+        self._headers_ok = False
+        # Статистика, отложенная до конца блока batch()
+        self._pending: Optional[Dict[str, List[Any]]] = None
 
         try:
             self._logger.info("Подключаемся к Google Sheets...")
@@ -29,6 +65,8 @@ class GoogleSheetsReporter:
                 ],
             )
             client = gspread.authorize(creds)
+            # Без таймаута запрос к зависшему API может ждать бесконечно
+            client.http_client.set_timeout(timeout)
 
             self._spreadsheet = client.open_by_key(spreadsheet_id)
             self._sheet1 = self._spreadsheet.sheet1
@@ -55,12 +93,16 @@ class GoogleSheetsReporter:
             )
             raise
 
-    def append_stats(self, processed_attempts: List[Tuple]) -> None:
+    def append_stats(
+        self, processed_attempts: Union[List[Tuple], pd.DataFrame]
+    ) -> None:
         """
-        Метод добавляет статистику по попыткам в Google Sheets.
+        Метод записывает статистику по попыткам в Google Sheets:
+        строки уже записанных дат обновляются, новые даты добавляются.
+        Принимает список записей или DataFrame из processing_attempts_columnar.
         Ничего не возвращает.
         """
-        if not processed_attempts:
+        if len(processed_attempts) == 0:
             self._logger.info("Нет данных для записи статистики.")
             return
 
@@ -69,28 +111,16 @@ class GoogleSheetsReporter:
                 f"Начало подсчета статистики для {len(processed_attempts)} записей."
             )
 
-            headers = [
-                "Дата",
-                "Всего попыток",
-                "Уникальные пользователи",
-                "Успешные попытки",
-                "(%) успешных попыток",
-                "Запускали код",
-                "Проверяли код",
-            ]
-
-            # Проверяем и обновляем заголовки
-            if self._sheet1.row_values(1) != headers:
-                self._logger.info("Обновляем заголовки таблицы.")
-                self._sheet1.update([headers], "A1:G1")
-
-            # Создаем DataFrame
-            attempts_df = pd.DataFrame(
-                processed_attempts, columns=DataProcessor.get_cols()
-            )
+            # Создаем DataFrame, если данные пришли кортежами
+            if isinstance(processed_attempts, pd.DataFrame):
+                attempts_df = processed_attempts
+            else:
+                attempts_df = pd.DataFrame(
+                    processed_attempts, columns=DataProcessor.get_cols()
+                )
 
             # Устанавливаем индекс для resample
-            attempts_df.set_index("created_at", inplace=True)
+            attempts_df = attempts_df.set_index("created_at")
 
             # Агрегируем данные по дням
             # Считаем сколько попыток было совершено, сколько было успешных и какое количество уникальных пользователей
@@ -146,12 +176,149 @@ class GoogleSheetsReporter:
             stats_df["created_at"] = stats_df["created_at"].dt.strftime("%Y-%m-%d")
 
             # Добавляем статистику в Google Таблицу
-            self._sheet1.append_rows(stats_df.values.tolist())
+            self._write_stats(stats_df.values.tolist())
 
-            self._logger.info(
-                f"Успешно добавлена статистика {stats_df['total_attempts'].sum()} попыток за {len(stats_df)} день."
-            )
+        except Exception as err:
+            self._logger.error(f"Ошибка при записи статистики: {repr(err)}.")
+            raise
+
+    def append_daily_stats(self, stats_rows: List[Tuple]) -> None:
+        """
+        Метод записывает в Google Sheets готовую статистику по дням,
+        например, из DatabaseInserter.get_daily_stats. Даты обновляются как в append_stats.
+        Строки должны идти в порядке столбцов STATS_HEADERS.
+        Ничего не возвращает.
+        """
+        if not stats_rows:
+            self._logger.info("Нет данных для записи статистики.")
+            return
+
+        try:
+            self._write_stats([list(row) for row in stats_rows])
 
         except Exception as err:
             self._logger.error(f"Ошибка при записи статистики: {repr(err)}.")
             raise
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Контекстный менеджер для записи статистики за много дней:
+        внутри блока append_stats и append_daily_stats только накапливают строки,
+        при выходе из блока все они записываются одним запросом.
+        Повторная статистика за дату внутри блока заменяет предыдущую.
+        """
+        self._pending = {}
+        try:
+            yield
+        finally:
+            pending, self._pending = self._pending, None
+            if pending:
+                try:
+                    self._flush(list(pending.values()))
+                except Exception as err:
+                    self._logger.error(f"Ошибка при записи статистики: {repr(err)}.")
+                    raise
+
+    def _call(self, method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Вызывает метод gspread с повтором до retries раз при превышении квоты (429)
+        и сбоях сервера (5xx). Пауза растет экспоненциально, со случайной добавкой.
+        Используется только внутри класса GoogleSheetsReporter.
+        """
+        for attempt_num in range(1, self._retries + 1):
+            try:
+                return method(*args, **kwargs)
+            except gspread.exceptions.APIError as err:
+                status_code = err.response.status_code
+                if (
+                    status_code not in RETRY_STATUS_CODES
+                    or attempt_num == self._retries
+                ):
+                    raise
+                delay = self._backoff * 2 ** (attempt_num - 1) + random.uniform(
+                    0, self._backoff
+                )
+                self._logger.warning(
+                    f"Попытка {attempt_num}/{self._retries} запроса к Google Sheets "
+                    f"не удалась (код {status_code}). Повтор через {delay:.1f} с."
+                )
+                time.sleep(delay)
+
+    def _load_index(self) -> None:
+        """
+        Одним запросом читает заголовки и столбец дат, запоминает строку каждой даты.
+        Повторно таблица не читается: индекс обновляется при каждой записи.
+        Используется только внутри класса GoogleSheetsReporter.
+        """
+        if self._date_rows is not None:
+            return
+
+        headers, dates = self._call(self._sheet1.batch_get, ["A1:G1", "A2:A"])
+        self._headers_ok = list(headers[0] if headers else []) == self.STATS_HEADERS
+        self._date_rows = {
+            str(row[0]): row_num
+            for row_num, row in enumerate(dates, start=2)
+            if row and row[0]
+        }
+        self._next_row = 2 + len(dates)
+
+        self._logger.info(f"В таблице найдено дат: {len(self._date_rows)}.")
+
+    def _write_stats(self, stats_rows: List[List[Any]]) -> None:
+        """
+        Записывает строки статистики или, внутри блока batch(), откладывает их.
+        Используется только внутри класса GoogleSheetsReporter.
+        """
+        if self._pending is not None:
+            for row in stats_rows:
+                self._pending[str(row[0])] = row
+            return
+
+        self._flush(stats_rows)
+
+    def _flush(self, stats_rows: List[List[Any]]) -> None:
+        """
+        Обновляет строки уже записанных дат, добавляет новые даты в конец
+        и при необходимости исправляет заголовки - все одним запросом batch_update.
+        Используется только внутри класса GoogleSheetsReporter.
+        """
+        self._load_index()
+
+        # Для повторяющихся дат остается последняя строка
+        rows_by_date = {str(row[0]): list(row) for row in stats_rows}
+        data = []
+        if not self._headers_ok:
+            self._logger.info("Обновляем заголовки таблицы.")
+            data.append({"range": "A1:G1", "values": [self.STATS_HEADERS]})
+
+        new_rows = []
+        for day, row in rows_by_date.items():
+            row_num = self._date_rows.get(day)
+            if row_num is None:
+                new_rows.append(row)
+            else:
+                data.append({"range": f"A{row_num}:G{row_num}", "values": [row]})
+        updated_cnt = len(rows_by_date) - len(new_rows)
+
+        first_new_row = self._next_row
+        last_new_row = first_new_row + len(new_rows) - 1
+        if new_rows:
+            data.append(
+                {"range": f"A{first_new_row}:G{last_new_row}", "values": new_rows}
+            )
+            # batch_update не расширяет лист, строки добавляются заранее
+            if last_new_row > self._sheet1.row_count:
+                self._call(self._sheet1.add_rows, last_new_row - self._sheet1.row_count)
+
+        self._call(self._sheet1.batch_update, data)
+
+        self._headers_ok = True
+        for row_num, row in enumerate(new_rows, start=first_new_row):
+            self._date_rows[str(row[0])] = row_num
+        self._next_row = last_new_row + 1
+
+        self._logger.info(
+            f"Записана статистика {sum(row[1] for row in rows_by_date.values())} попыток "
+            f"за {len(rows_by_date)} дн.: обновлено {updated_cnt}, добавлено {len(new_rows)}."
+        )
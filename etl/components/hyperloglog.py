@@ -0,0 +1,132 @@
+from typing import Iterable, Optional
+from hashlib import blake2b
+import math
+
+MIN_PRECISION = 4
+MAX_PRECISION = 18
+DEFAULT_PRECISION = 14
+
+
+def _hash64(value: str) -> int:
+    """64-битный хэш строки, одинаковый между запусками и процессами."""
+    return int.from_bytes(blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    Скетч HyperLogLog для приблизительного подсчета уникальных значений.
+    Хранит 2^precision регистров по одному байту, относительная ошибка
+    оценки около 1.04 / sqrt(2^precision). Скетчи объединяются без потерь
+    (поэлементный максимум), поэтому уникальных пользователей за неделю
+    или месяц можно получить из дневных скетчей без обращения к сырым данным.
+    """
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(
+        self, precision: int = DEFAULT_PRECISION, registers: Optional[bytes] = None
+    ):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(
+                f"precision должен быть от {MIN_PRECISION} до {MAX_PRECISION}."
+            )
+        if registers is not None and len(registers) != 1 << precision:
+            raise ValueError("Размер регистров не соответствует precision.")
+
+        self.precision = precision
+        self.registers = (
+            bytearray(registers) if registers is not None else bytearray(1 << precision)
+        )
+
+    @classmethod
+    def from_error(cls, error: float) -> "HyperLogLog":
+        """Создает скетч с наименьшей точностью, дающей относительную ошибку не больше error."""
+        if not 0 < error < 1:
+            raise ValueError("error должен быть в интервале (0, 1).")
+
+        precision = math.ceil(math.log2((1.04 / error) ** 2))
+        return cls(min(max(precision, MIN_PRECISION), MAX_PRECISION))
+
+    @property
+    def error(self) -> float:
+        """Стандартная относительная ошибка оценки."""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, value: str) -> None:
+        """Добавляет значение в скетч."""
+        hash_value = _hash64(value)
+        rest_bits = 64 - self.precision
+        index = hash_value >> rest_bits
+        rest = hash_value & ((1 << rest_bits) - 1)
+        # Позиция первой единицы в оставшихся битах
+        rank = rest_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[str]) -> None:
+        """Добавляет в скетч все значения."""
+        for value in values:
+            self.add(value)
+
+    def reduce(self, precision: int) -> "HyperLogLog":
+        """
+        Возвращает копию скетча с меньшей точностью.
+        Нужно для объединения скетчей, построенных с разной точностью.
+        """
+        if precision > self.precision:
+            raise ValueError("Точность скетча можно только уменьшить.")
+        if precision == self.precision:
+            return HyperLogLog(precision, self.registers)
+
+        shift = self.precision - precision
+        reduced = HyperLogLog(precision)
+        for index, rank in enumerate(self.registers):
+            if rank == 0:
+                continue
+            # Отброшенные биты индекса становятся старшими битами остатка хэша
+            dropped = index & ((1 << shift) - 1)
+            new_rank = shift - dropped.bit_length() + 1 if dropped else shift + rank
+            new_index = index >> shift
+            if new_rank > reduced.registers[new_index]:
+                reduced.registers[new_index] = new_rank
+
+        return reduced
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """
+        Объединяет другой скетч с текущим на месте и возвращает текущий.
+        При разной точности результат имеет меньшую из них.
+        """
+        if other.precision < self.precision:
+            reduced = self.reduce(other.precision)
+            self.precision, self.registers = reduced.precision, reduced.registers
+        elif other.precision > self.precision:
+            other = other.reduce(self.precision)
+
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        """Возвращает оценку количества уникальных значений."""
+        registers_cnt = len(self.registers)
+        zeros_cnt = self.registers.count(0)
+
+        alpha = 0.7213 / (1 + 1.079 / registers_cnt)
+        estimate = (
+            alpha * registers_cnt**2 / math.fsum(2.0**-rank for rank in self.registers)
+        )
+
+        # На малых количествах точнее линейный подсчет по пустым регистрам
+        if estimate <= 2.5 * registers_cnt and zeros_cnt:
+            estimate = registers_cnt * math.log(registers_cnt / zeros_cnt)
+
+        return round(estimate)
+
+    def to_bytes(self) -> bytes:
+        """Регистры скетча для сохранения в БД."""
+        return bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, precision: int, registers: bytes) -> "HyperLogLog":
+        """Восстанавливает скетч из сохраненных регистров."""
+        return cls(precision, registers)
@@ -1,24 +1,111 @@
+from typing import Any, Dict, Optional
 from pathlib import Path
 from datetime import datetime, timedelta
+from logging.handlers import QueueHandler, QueueListener
+import atexit
 import logging
+import queue
+import threading
 
 LOG_DIR = Path(__file__).parent.parent.parent / "logs"
 SCRIPT_START_DATE = datetime.now().strftime("%Y-%m-%d")
+LOG_FORMAT = "%(name)s | %(asctime)s | %(levelname)s | %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
 
-def setup_logging() -> None:
-    """Настраивает логирование."""
-    # Создаем директорию для логов, если она не существует
-    LOG_DIR.mkdir(parents=True, exist_ok=True)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        filename=LOG_DIR / f"{SCRIPT_START_DATE}.log",
-        filemode="a",
-        encoding="utf-8",
-        datefmt="%Y-%m-%d %H:%M:%S",
-        format="%(name)s | %(asctime)s | %(levelname)s | %(message)s",
-    )
+def setup_logging(use_queue: bool = True) -> None:
+    """
+    Настраивает логирование. Повторные вызовы ничего не меняют.
+    При use_queue=True записи из рабочих потоков только кладутся в очередь,
+    а в файл их пишет фоновый поток QueueListener - запись на диск
+    не тормозит обработку данных. Очередь дописывается при выходе из программы.
+    """
+    global _listener
+
+    with _setup_lock:
+        root_logger = logging.getLogger()
+        if root_logger.handlers:
+            return
+
+        # Создаем директорию для логов, если она не существует
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+
+        file_handler = logging.FileHandler(
+            LOG_DIR / f"{SCRIPT_START_DATE}.log", mode="a", encoding="utf-8"
+        )
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+        root_logger.setLevel(logging.INFO)
+
+        if not use_queue:
+            root_logger.addHandler(file_handler)
+            return
+
+        log_queue = queue.SimpleQueue()
+        root_logger.addHandler(QueueHandler(log_queue))
+        _listener = QueueListener(log_queue, file_handler)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """
+    Дописывает в файл все записи из очереди и останавливает фоновый поток.
+    Вызывается автоматически при выходе из программы.
+    """
+    global _listener
+
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+class RejectionSummary:
+    """
+    Сводка пропущенных записей для лога. Вместо сообщения на каждую запись
+    в лог попадают первые samples примеров по каждой причине, а flush()
+    пишет количество пропущенных записей по причинам. Текст сообщения
+    форматируется, только если оно попадает в лог.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        samples: int = 3,
+        counts: Optional[Dict[str, int]] = None,
+    ):
+        self._logger = logger
+        self._samples = samples
+        self._counts = counts
+        self.rejections: Dict[str, int] = {}
+
+    def add(
+        self, reason: str, level: int, msg: str, *args: Any, count: int = 1
+    ) -> None:
+        """
+        Учитывает count пропущенных записей с причиной reason.
+        msg и args - сообщение в формате logging, пишется в лог как пример,
+        пока по этой причине записано меньше samples примеров.
+        """
+        seen = self.rejections.get(reason, 0)
+        self.rejections[reason] = seen + count
+        if seen < self._samples:
+            self._logger.log(level, msg, *args)
+
+    def flush(self) -> None:
+        """
+        Пишет в лог количество пропущенных записей по причинам,
+        добавляет их в counts и начинает сводку заново.
+        """
+        for reason, count in sorted(self.rejections.items(), key=lambda item: -item[1]):
+            self._logger.warning("Пропущено записей (%s): %d.", reason, count)
+            if self._counts is not None:
+                self._counts[reason] = self._counts.get(reason, 0) + count
+
+        self.rejections = {}
 
 
 def clean_old_logs(days: int = 3) -> None:
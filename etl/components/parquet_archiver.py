@@ -0,0 +1,215 @@
+from typing import Iterable, List, Optional, Tuple, Union
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import logging
+import os
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .data_processor import DataProcessor
+from .logger_configs import setup_logging
+
+setup_logging()
+
+# Ключ уникальности записи, как у ограничения unique_attempt в БД
+UNIQUE_KEY = ["user_id", "attempt_type", "created_at"]
+
+# Схема архива: категориальные attempt_type и oauth_consumer_key,
+# nullable boolean is_correct, created_at с точностью до микросекунд
+ARCHIVE_SCHEMA = pa.schema(
+    [
+        ("user_id", pa.string()),
+        ("oauth_consumer_key", pa.dictionary(pa.int32(), pa.string())),
+        ("lis_result_sourcedid", pa.string()),
+        ("lis_outcome_service_url", pa.string()),
+        ("is_correct", pa.bool_()),
+        ("attempt_type", pa.dictionary(pa.int8(), pa.string())),
+        ("created_at", pa.timestamp("us")),
+    ]
+)
+
+
+class ParquetArchiver:
+    """
+    Класс для архивирования обработанных попыток в файлы Parquet.
+    Каждый день хранится в своей папке dt=YYYY-MM-DD, каждая запись
+    в архив добавляет новый файл, compact() склеивает файлы дня в один.
+    Чтение из архива не требует обращения к БД.
+    """
+
+    def __init__(self, directory: str, compression: str = "zstd"):
+        self._directory = Path(directory)
+        self._compression = compression
+        self._logger = logging.getLogger("ParquetArchiver")
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def to_frame(processed_attempts: Union[List[Tuple], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Приводит обработанные записи (кортежи или DataFrame) к DataFrame
+        с компактными типами столбцов архива.
+        """
+        attempts_df = pd.DataFrame(processed_attempts, columns=DataProcessor.get_cols())
+        return attempts_df.astype(
+            {
+                "user_id": object,
+                "oauth_consumer_key": "category",
+                "lis_result_sourcedid": object,
+                "lis_outcome_service_url": object,
+                "is_correct": "boolean",
+                "attempt_type": pd.CategoricalDtype(["run", "submit"]),
+                "created_at": "datetime64[us]",
+            }
+        )
+
+    def _day_dir(self, day: date) -> Path:
+        """Папка дня в архиве. Используется только внутри класса ParquetArchiver."""
+        return self._directory / f"dt={day.isoformat()}"
+
+    def _write_file(self, day: date, table: pa.Table) -> Path:
+        """
+        Записывает таблицу новым файлом в папку дня. Файл сначала пишется
+        под временным именем, поэтому читатели не видят недописанных файлов.
+        Используется только внутри класса ParquetArchiver.
+        """
+        day_dir = self._day_dir(day)
+        day_dir.mkdir(exist_ok=True)
+
+        name = f"part-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+        path = day_dir / name
+        tmp_path = day_dir / f".{name}.tmp"
+        pq.write_table(table, tmp_path, compression=self._compression)
+        os.replace(tmp_path, path)
+        return path
+
+    def write(self, processed_attempts: Union[List[Tuple], pd.DataFrame]) -> List[date]:
+        """
+        Добавляет обработанные записи в архив: по одному новому файлу на каждый день.
+        Возвращает список дней, в которые были добавлены записи.
+        """
+        if len(processed_attempts) == 0:
+            return []
+
+        try:
+            attempts_df = self.to_frame(processed_attempts)
+            days = []
+            for day, day_df in attempts_df.groupby(
+                attempts_df["created_at"].dt.date, sort=True
+            ):
+                table = pa.Table.from_pandas(
+                    day_df, schema=ARCHIVE_SCHEMA, preserve_index=False
+                )
+                self._write_file(day, table)
+                days.append(day)
+
+            self._logger.info(
+                f"В архив записано {len(attempts_df)} записей за {len(days)} дн."
+            )
+            return days
+
+        except (OSError, pa.ArrowException) as err:
+            self._logger.error(f"Ошибка при записи в архив Parquet: {repr(err)}.")
+            raise
+
+    def _day_files(self, day: date) -> List[Path]:
+        """Файлы дня в архиве. Используется только внутри класса ParquetArchiver."""
+        return sorted(self._day_dir(day).glob("*.parquet"))
+
+    def _read_files(
+        self, paths: Iterable[Path], columns: Optional[List[str]] = None
+    ) -> pa.Table:
+        """
+        Читает файлы архива через memory map и объединяет в одну таблицу.
+        Используется только внутри класса ParquetArchiver.
+        """
+        # ParquetFile вместо read_table: папки dt= не должны превращаться в столбец
+        tables = [
+            pq.ParquetFile(path, memory_map=True).read(columns=columns)
+            for path in paths
+        ]
+        if not tables:
+            schema = ARCHIVE_SCHEMA
+            if columns is not None:
+                schema = pa.schema([schema.field(column) for column in columns])
+            return schema.empty_table()
+
+        return pa.concat_tables(tables, promote_options="permissive")
+
+    @staticmethod
+    def _to_pandas(table: pa.Table) -> pd.DataFrame:
+        """
+        Переводит таблицу архива в DataFrame с типами как у to_frame.
+        Используется только внутри класса ParquetArchiver.
+        """
+        attempts_df = table.to_pandas(types_mapper={pa.bool_(): pd.BooleanDtype()}.get)
+        if "attempt_type" in attempts_df:
+            attempts_df["attempt_type"] = attempts_df["attempt_type"].astype(
+                pd.CategoricalDtype(["run", "submit"])
+            )
+        return attempts_df
+
+    def read(
+        self,
+        start: date,
+        end: date,
+        columns: Optional[List[str]] = None,
+        drop_duplicates: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Читает из архива записи за дни периода [start, end].
+        columns - список нужных столбцов (по умолчанию все).
+        Повторно загруженные записи убираются по ключу unique_attempt,
+        если drop_duplicates=True и все столбцы ключа прочитаны.
+        Результат подходит для GoogleSheetsReporter.append_stats.
+        """
+        paths = []
+        day = start
+        while day <= end:
+            paths.extend(self._day_files(day))
+            day += timedelta(days=1)
+
+        try:
+            attempts_df = self._to_pandas(self._read_files(paths, columns))
+        except (OSError, pa.ArrowException) as err:
+            self._logger.error(f"Ошибка при чтении архива Parquet: {repr(err)}.")
+            raise
+
+        if drop_duplicates and set(UNIQUE_KEY) <= set(attempts_df.columns):
+            attempts_df = attempts_df.drop_duplicates(UNIQUE_KEY, ignore_index=True)
+
+        self._logger.info(
+            f"Из архива прочитано {len(attempts_df)} записей за {start} - {end}."
+        )
+        return attempts_df
+
+    def compact(self, days: Iterable[date]) -> None:
+        """
+        Склеивает файлы каждого из дней в один файл без повторных записей.
+        Новый файл появляется раньше, чем удаляются старые, поэтому
+        при сбое в середине данные не теряются (дубликаты убирает read).
+        """
+        for day in days:
+            paths = self._day_files(day)
+            if len(paths) < 2:
+                continue
+
+            try:
+                day_df = self._to_pandas(self._read_files(paths))
+                day_df = day_df.drop_duplicates(UNIQUE_KEY).sort_values("created_at")
+                self._write_file(
+                    day,
+                    pa.Table.from_pandas(
+                        self.to_frame(day_df),
+                        schema=ARCHIVE_SCHEMA,
+                        preserve_index=False,
+                    ),
+                )
+                for path in paths:
+                    path.unlink()
+            except (OSError, pa.ArrowException) as err:
+                self._logger.error(f"Ошибка при склейке архива за {day}: {repr(err)}.")
+                raise
+
+            self._logger.info(f"Архив за {day}: {len(paths)} файлов склеено в один.")
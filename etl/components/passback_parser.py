@@ -0,0 +1,48 @@
+from typing import Any
+from functools import lru_cache
+import ast
+import re
+
+# Размер LRU-кэша распарсенных строк passback_params
+PASSBACK_CACHE_SIZE = 65536
+
+# Строка в одинарных или двойных кавычках без экранирования и переносов строк
+_STR = r"'[^'\\\n\r\x00]*'|\"[^\"\\\n\r\x00]*\""
+_ITEM = rf"(?:{_STR})[ \t]*:[ \t]*(?:{_STR}|None)"
+
+# Словарь целиком: {'key': 'value', 'key': None, ...}
+_DICT_RE = re.compile(
+    rf"\{{[ \t]*(?:{_ITEM}(?:[ \t]*,[ \t]*{_ITEM})*(?:[ \t]*,)?)?[ \t]*\}}"
+)
+# Одна пара ключ-значение
+_ITEM_RE = re.compile(rf"({_STR})[ \t]*:[ \t]*({_STR}|None)")
+
+
+@lru_cache(maxsize=PASSBACK_CACHE_SIZE)
+def _parse_cached(passback_params: str) -> Any:
+    """
+    Разбирает строку passback_params. Результат кэшируется по исходной строке.
+    Простой формат словаря со строковыми ключами и значениями str/None
+    разбирается регулярными выражениями, все остальное - через ast.literal_eval.
+    """
+    if _DICT_RE.fullmatch(passback_params):
+        return {
+            item.group(1)[1:-1]: (
+                None if item.group(2) == "None" else item.group(2)[1:-1]
+            )
+            for item in _ITEM_RE.finditer(passback_params)
+        }
+
+    return ast.literal_eval(passback_params)
+
+
+def parse_passback_params(passback_params: Any) -> Any:
+    """
+    Быстрая замена ast.literal_eval для passback_params.
+    Семантика та же: при некорректной строке выбрасывается SyntaxError или ValueError.
+    Возвращаемый словарь общий для одинаковых строк, изменять его нельзя.
+    """
+    if not isinstance(passback_params, str):
+        return ast.literal_eval(passback_params)
+
+    return _parse_cached(passback_params)
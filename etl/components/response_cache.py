@@ -0,0 +1,119 @@
+from typing import Any, Callable, Iterator, List, Optional
+from contextlib import contextmanager
+from pathlib import Path
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from .logger_configs import setup_logging
+
+setup_logging()
+
+# Размер чанка при чтении файла кэша
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class ResponseCache:
+    """
+    Дисковый кэш ответов API: каждый период хранится отдельным файлом .json.gz,
+    ключ - (client, start, end). Старые файлы удаляются по возрасту (max_age_days),
+    а при превышении общего размера (max_size_mb) - начиная с давно не читанных.
+    """
+
+    def __init__(self, directory: str, max_age_days: int = 30, max_size_mb: int = 1024):
+        self._directory = Path(directory)
+        self._max_age = max_age_days * 24 * 60 * 60
+        self._max_size = max_size_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger("ResponseCache")
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self.evict()
+
+    def _path(self, client: str, start: str, end: str) -> Path:
+        """Путь к файлу кэша для периода. Используется только внутри класса ResponseCache."""
+        key = hashlib.sha256(f"{client}|{start}|{end}".encode("utf-8")).hexdigest()
+        return self._directory / f"{key[:32]}.json.gz"
+
+    def contains(self, client: str, start: str, end: str) -> bool:
+        """Проверяет, есть ли период в кэше."""
+        return self._path(client, start, end).exists()
+
+    def iter_chunks(self, client: str, start: str, end: str) -> Iterator[bytes]:
+        """
+        Читает распакованный ответ из кэша чанками для потокового разбора.
+        Выбрасывает FileNotFoundError, если периода нет в кэше.
+        """
+        path = self._path(client, start, end)
+        with gzip.open(path, "rb") as file:
+            # Время изменения используется для вытеснения давно не читанных файлов
+            os.utime(path)
+            while chunk := file.read(READ_CHUNK_SIZE):
+                yield chunk
+
+    def get(self, client: str, start: str, end: str) -> Optional[List[Any]]:
+        """Возвращает ответ из кэша или None, если периода нет в кэше."""
+        path = self._path(client, start, end)
+        try:
+            with gzip.open(path, "rb") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return None
+
+        os.utime(path)
+        self._logger.info(f"Период {start} - {end} прочитан из кэша {path.name}.")
+        return data
+
+    def put(self, client: str, start: str, end: str, data: List[Any]) -> None:
+        """Сохраняет ответ за период в кэш."""
+        with self.writer(client, start, end) as write:
+            write(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    @contextmanager
+    def writer(self, client: str, start: str, end: str) -> Iterator[Callable]:
+        """
+        Контекстный менеджер для записи ответа в кэш по частям.
+        Возвращает функцию записи байтов. Файл появляется в кэше только
+        при успешном выходе из блока, при ошибке недописанный файл удаляется.
+        """
+        path = self._path(client, start, end)
+        tmp_path = path.with_name(
+            f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        try:
+            with gzip.open(tmp_path, "wb") as file:
+                yield file.write
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        self._logger.info(f"Период {start} - {end} сохранен в кэш {path.name}.")
+        self.evict()
+
+    def evict(self) -> None:
+        """Удаляет устаревшие файлы и самые давно не читанные при превышении размера."""
+        with self._lock:
+            now = time.time()
+            files = []
+            for path in self._directory.glob("*.json.gz"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+            removed_cnt = 0
+            total_size = sum(size for _, size, _ in files)
+            for mtime, size, path in sorted(files, key=lambda file: file[0]):
+                if now - mtime <= self._max_age and total_size <= self._max_size:
+                    break
+                path.unlink(missing_ok=True)
+                total_size -= size
+                removed_cnt += 1
+
+        if removed_cnt:
+            self._logger.info(f"Из кэша удалено файлов: {removed_cnt}.")
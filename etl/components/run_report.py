@@ -0,0 +1,189 @@
+from typing import Any, Dict, Iterable, Iterator, Optional
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import json
+import logging
+import sys
+import threading
+import time
+from .logger_configs import setup_logging, LOG_DIR
+
+try:
+    import resource
+except ImportError:  # Нет на Windows, пиковая память тогда не замеряется
+    resource = None
+
+setup_logging()
+
+REPORTS_DIR = LOG_DIR / "reports"
+
+
+def get_peak_rss_mb() -> Optional[float]:
+    """Пиковая память процесса (RSS) в МБ или None, если замер недоступен."""
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # На macOS ru_maxrss в байтах, на Linux - в килобайтах
+    max_rss_mb = max_rss / 1024 / 1024 if sys.platform == "darwin" else max_rss / 1024
+    return round(max_rss_mb, 1)
+
+
+def get_children_cpu_time() -> float:
+    """
+    Процессорное время завершившихся дочерних процессов (например,
+    ProcessPoolExecutor) в секундах или 0, если замер недоступен.
+    """
+    if resource is None:
+        return 0.0
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class RunReport:
+    """
+    Класс для замеров этапов ETL-процесса: время работы, процессорное время,
+    количество записей и скорость по этапам, пиковая память всего запуска,
+    а также причины отклонения записей. Итог сохраняется в JSON и добавляется в email.
+    Этап можно замерять по частям (например, по пачкам) - значения суммируются.
+    """
+
+    def __init__(self, name: str = "etl"):
+        self._name = name
+        self._started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger("RunReport")
+
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.rejections: Dict[str, int] = {}
+        self.info: Dict[str, Any] = {}
+
+    def _add(
+        self,
+        name: str,
+        wall_time: float,
+        cpu_time: float,
+        records: int = 0,
+    ) -> None:
+        """Добавляет замер к этапу. Используется только внутри класса RunReport."""
+        with self._lock:
+            stage = self.stages.setdefault(
+                name,
+                {"calls": 0, "wall_time": 0.0, "cpu_time": 0.0, "records": 0},
+            )
+            stage["calls"] += 1
+            stage["wall_time"] += wall_time
+            stage["cpu_time"] += cpu_time
+            stage["records"] += records
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, int]]:
+        """
+        Контекстный менеджер для замера этапа. Возвращает словарь,
+        в который код этапа записывает количество записей: stage["records"] = n.
+        Процессорное время считается для текущего потока и для дочерних
+        процессов, завершившихся за время этапа (параллельная обработка
+        при PROCESSING_WORKERS).
+        """
+        counters = {"records": 0}
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        children_cpu_started = get_children_cpu_time()
+        try:
+            yield counters
+        finally:
+            self._add(
+                name,
+                time.perf_counter() - wall_started,
+                time.thread_time()
+                - cpu_started
+                + get_children_cpu_time()
+                - children_cpu_started,
+                counters["records"],
+            )
+
+    def iter_stage(self, name: str, batches: Iterable[Any]) -> Iterator[Any]:
+        """
+        Оборачивает итератор пачек: время получения каждой пачки
+        и количество записей в ней добавляются к этапу name.
+        """
+        iterator = iter(batches)
+        while True:
+            with self.stage(name) as counters:
+                batch = next(iterator, None)
+                if batch is not None:
+                    counters["records"] = len(batch)
+            if batch is None:
+                return
+            yield batch
+
+    def to_dict(self, status: str = "success", error: str = None) -> Dict[str, Any]:
+        """Возвращает отчет в виде словаря для сохранения в JSON."""
+        with self._lock:
+            stages = {
+                name: {
+                    **stage,
+                    "wall_time": round(stage["wall_time"], 3),
+                    "cpu_time": round(stage["cpu_time"], 3),
+                    "records_per_sec": (
+                        round(stage["records"] / stage["wall_time"])
+                        if stage["records"] and stage["wall_time"]
+                        else None
+                    ),
+                }
+                for name, stage in self.stages.items()
+            }
+            rejections = dict(
+                sorted(self.rejections.items(), key=lambda item: -item[1])
+            )
+
+        return {
+            "name": self._name,
+            "status": status,
+            "error": error,
+            "started_at": self._started_at.isoformat(timespec="seconds"),
+            "wall_time": round(time.perf_counter() - self._started, 3),
+            "cpu_time": round(time.process_time() + get_children_cpu_time(), 3),
+            "peak_rss_mb": get_peak_rss_mb(),
+            **self.info,
+            "stages": stages,
+            "rejections": rejections,
+        }
+
+    def save(
+        self, status: str = "success", error: str = None, directory: Path = REPORTS_DIR
+    ) -> Path:
+        """Сохраняет отчет в JSON-файл в папку directory и возвращает путь к нему."""
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self._name}_{self._started_at:%Y-%m-%d_%H-%M-%S}.json"
+        path.write_text(
+            json.dumps(self.to_dict(status, error), ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        self._logger.info(f"Отчет о запуске сохранен в {path.name}.")
+        return path
+
+    def format_stages(self) -> str:
+        """Возвращает текстовую разбивку по этапам и причинам отклонения для email."""
+        report = self.to_dict()
+        lines = []
+        for name, stage in report["stages"].items():
+            line = (
+                f"• {name}: {stage['wall_time']:.1f} с (CPU {stage['cpu_time']:.1f} с)"
+            )
+            if stage["records"]:
+                line += f", записей: {stage['records']}"
+            if stage["records_per_sec"]:
+                line += f", {stage['records_per_sec']} зап/с"
+            lines.append(line)
+
+        if report["peak_rss_mb"] is not None:
+            lines.append(f"• Пиковая память: {report['peak_rss_mb']:.0f} МБ")
+
+        for reason, count in report["rejections"].items():
+            lines.append(f"• Отклонено ({reason}): {count}")
+
+        return "\n".join(lines)
@@ -2,18 +2,37 @@ import os
 import base64
 import json
 import logging
-from typing import Tuple
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
 from dotenv import load_dotenv, find_dotenv
-from components import APIClient, DataProcessor, DatabaseInserter
-from components import GoogleSheetsReporter, EmailNotifier
+from components import DataProcessor, EmailNotifier, HyperLogLog, RunReport
 from components import setup_logging, clean_old_logs
 
+# Компоненты с тяжелыми зависимостями импортируются в функциях, которые их создают:
+# путь с ошибкой и запуски без части этапов не загружают лишние библиотеки
+if TYPE_CHECKING:
+    from components import APIClient, DatabaseInserter, GoogleSheetsReporter
+    from components import AttemptKeyIndex, ParquetArchiver
+
 
 setup_logging()
 clean_old_logs()
 logger = logging.getLogger("Main")
 
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+# Таймауты этапов после загрузки в БД, в секундах (переопределяются POST_LOAD_TIMEOUT_<ЭТАП>)
+POST_LOAD_TIMEOUTS = {"sheets": 300, "unique_users": 120, "archive": 600}
+
+
+def get_int_env(name: str, default: int = 0) -> int:
+    """Возвращает целочисленную переменную окружения или значение по умолчанию."""
+    value = os.getenv(name)
+    return int(value) if value else default
+
 
 def get_date_range() -> Tuple[str, str]:
     """
@@ -31,8 +50,61 @@ def get_date_range() -> Tuple[str, str]:
     )
 
     return (
-        start_date.strftime("%Y-%m-%d %H:%M:%S.%f"),
-        end_date.strftime("%Y-%m-%d %H:%M:%S.%f"),
+        start_date.strftime(DATE_FORMAT),
+        end_date.strftime(DATE_FORMAT),
+    )
+
+
+def get_incremental_date_range(db_inserter: "DatabaseInserter") -> Tuple[str, str]:
+    """
+    Генерирует период для инкрементальной загрузки: от водяного знака до текущего момента.
+    Если водяного знака еще нет, загрузка начинается со вчерашнего дня.
+    ETL_WATERMARK_LAG_MINUTES сдвигает конец периода назад для запаздывающих данных.
+    Начало может оказаться позже конца (например, после увеличения задержки),
+    тогда загружать нечего.
+    Возвращает кортеж из 2 дат в строковом формате.
+    """
+    watermark = db_inserter.get_watermark()
+    lag = timedelta(minutes=get_int_env("ETL_WATERMARK_LAG_MINUTES"))
+    end_date = datetime.now() - lag
+
+    if watermark is None:
+        start, _ = get_date_range()
+        start_date = datetime.strptime(start, DATE_FORMAT)
+    else:
+        start_date = watermark + timedelta(microseconds=1)
+
+    logger.info(f"Инкрементальная загрузка с {start_date} по {end_date}.")
+
+    return start_date.strftime(DATE_FORMAT), end_date.strftime(DATE_FORMAT)
+
+
+def get_api_client(workers: int = 1) -> "APIClient":
+    """
+    Возвращает объект класса APIClient.
+    Если задан API_CACHE_DIR, ответы за закрытые дни кэшируются на диске,
+    API_REPLAY=1 включает режим воспроизведения только из кэша.
+    В пуле HTTP-соединений не меньше workers соединений.
+    """
+    from components import APIClient, ResponseCache
+
+    cache_dir = os.getenv("API_CACHE_DIR")
+    cache = None
+    if cache_dir:
+        cache = ResponseCache(
+            cache_dir,
+            max_age_days=get_int_env("API_CACHE_MAX_AGE_DAYS", 30),
+            max_size_mb=get_int_env("API_CACHE_MAX_SIZE_MB", 1024),
+        )
+
+    return APIClient(
+        url=os.getenv("API_URL"),
+        cache=cache,
+        replay=os.getenv("API_REPLAY") == "1",
+        connect_timeout=get_int_env("API_CONNECT_TIMEOUT", 10),
+        read_timeout=get_int_env("API_READ_TIMEOUT", 180),
+        retries=get_int_env("API_RETRIES", 3),
+        pool_size=max(get_int_env("API_MAX_WORKERS", 4), workers),
     )
 
 
@@ -47,12 +119,591 @@ def get_email_notifier() -> EmailNotifier:
     )
 
 
+def get_sheets_reporter() -> "GoogleSheetsReporter":
+    """Возвращает объект класса GoogleSheetsReporter."""
+    from components import GoogleSheetsReporter
+
+    credentials_json = base64.b64decode(
+        os.getenv("GOOGLE_SHEETS_CREDENTIALS_BASE64")
+    ).decode("utf-8")
+    return GoogleSheetsReporter(
+        credentials_dict=json.loads(credentials_json),
+        spreadsheet_id=os.getenv("SPREADSHEET_ID"),
+    )
+
+
+def get_db_inserter(workers: int = 1) -> "DatabaseInserter":
+    """
+    Возвращает объект класса DatabaseInserter.
+    В пуле не меньше workers соединений, чтобы потоки не ждали друг друга.
+    """
+    from components import DatabaseInserter
+
+    return DatabaseInserter(
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+        database=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        min_connections=get_int_env("DB_POOL_MIN", 1),
+        max_connections=max(get_int_env("DB_POOL_MAX", 4), workers),
+        health_check_interval=get_int_env("DB_HEALTH_CHECK_SECONDS", 30),
+    )
+
+
+def get_parquet_archiver() -> Optional["ParquetArchiver"]:
+    """
+    Возвращает объект класса ParquetArchiver для папки PARQUET_ARCHIVE_DIR
+    или None, если архив не настроен.
+    """
+    archive_dir = os.getenv("PARQUET_ARCHIVE_DIR")
+    if not archive_dir:
+        return None
+
+    from components import ParquetArchiver
+
+    return ParquetArchiver(archive_dir)
+
+
+def load_key_index(
+    db_inserter: "DatabaseInserter",
+    start: Any,
+    end: Any,
+    report: Optional[RunReport] = None,
+) -> Optional["AttemptKeyIndex"]:
+    """
+    Загружает индекс ключей попыток, которые уже есть в БД за период [start, end],
+    если задан DEDUP_INDEX: exact - точный индекс, bloom - фильтр Блума
+    с долей ложных срабатываний DEDUP_BLOOM_ERROR (по умолчанию 1%).
+    После этого вставки не передают в БД уже загруженные записи.
+    Возвращает индекс или None, если DEDUP_INDEX не задан.
+    """
+    mode = os.getenv("DEDUP_INDEX")
+    if not mode:
+        return None
+    if mode not in ("exact", "bloom"):
+        raise ValueError(f"DEDUP_INDEX должен быть exact или bloom, получено: {mode}")
+
+    bloom_error = None
+    if mode == "bloom":
+        bloom_error = float(os.getenv("DEDUP_BLOOM_ERROR") or 0.01)
+
+    report = report or RunReport()
+    with report.stage("dedup_index") as stage:
+        key_index = db_inserter.load_key_index(start, end, bloom_error=bloom_error)
+        stage["records"] = key_index.keys_cnt
+    return key_index
+
+
+def log_dedup_counts(
+    key_index: Optional["AttemptKeyIndex"], report: Optional[RunReport] = None
+) -> None:
+    """
+    Пишет в лог и в report, сколько записей оказались новыми,
+    а сколько уже были в БД и не передавались. При key_index=None ничего не делает.
+    """
+    if key_index is None:
+        return
+
+    counts = {
+        "new": key_index.new_cnt,
+        "existing": key_index.existing_cnt,
+        "bloom_false_positives": key_index.false_positive_cnt,
+    }
+    logger.info(
+        f"Индекс ключей: новых записей {counts['new']}, "
+        f"уже загруженных {counts['existing']} (в БД не передавались)."
+    )
+    if report is not None:
+        report.info["dedup"] = counts
+
+
+def insert_to_db(
+    db_inserter: "DatabaseInserter",
+    processed_attempts: List[Tuple],
+    commit: bool = True,
+) -> None:
+    """
+    Вставляет обработанные записи в БД способом из DB_LOAD_MODE:
+    copy - через COPY и временную таблицу, иначе - через execute_batch.
+    """
+    if os.getenv("DB_LOAD_MODE") == "copy":
+        db_inserter.copy_attempts(processed_attempts, commit=commit)
+    else:
+        db_inserter.insert_attempts(processed_attempts, commit=commit)
+
+
+def update_user_sketches(
+    user_sketches: Optional[Dict], processed_attempts: List[Tuple]
+) -> None:
+    """
+    Добавляет пользователей обработанной пачки в дневные скетчи HyperLogLog.
+    Точность скетчей задается допустимой ошибкой HLL_ERROR (по умолчанию 1%).
+    При user_sketches=None ничего не делает.
+    """
+    if user_sketches is None:
+        return
+
+    error = float(os.getenv("HLL_ERROR") or 0.01)
+    DataProcessor.update_daily_sketches(
+        user_sketches,
+        processed_attempts,
+        precision=HyperLogLog.from_error(error).precision,
+    )
+
+
+def get_processed_handler(
+    user_sketches: Optional[Dict],
+    archiver: Optional["ParquetArchiver"],
+    archived_days: Optional[Set] = None,
+) -> Optional[Callable[[Any], None]]:
+    """
+    Возвращает функцию, которую загрузка вызывает для каждой обработанной пачки:
+    пользователи добавляются в скетчи, записи - в архив Parquet
+    (дни архива собираются в archived_days). None, если оба этапа выключены.
+    """
+    if user_sketches is None and archiver is None:
+        return None
+
+    def handle(processed_batch: Any) -> None:
+        update_user_sketches(user_sketches, processed_batch)
+        if archiver is not None:
+            days = archiver.write(processed_batch)
+            if archived_days is not None:
+                archived_days.update(days)
+
+    return handle
+
+
+def log_unique_users(db_inserter: "DatabaseInserter", day: str) -> None:
+    """
+    Пишет в лог DAU, WAU и MAU на день day, посчитанные объединением скетчей.
+    При HLL_VERIFY=1 рядом пишутся точные значения по таблице attempts.
+    """
+    day_date = datetime.strptime(day, DATE_FORMAT).date()
+    verify = os.getenv("HLL_VERIFY") == "1"
+
+    for name, days in (("DAU", 1), ("WAU", 7), ("MAU", 30)):
+        period_start = day_date - timedelta(days=days - 1)
+        message = f"{name} на {day_date}: ~{db_inserter.get_unique_users(period_start, day_date)}"
+        if verify:
+            exact = db_inserter.get_unique_users(period_start, day_date, exact=True)
+            message += f", точно: {exact}"
+        logger.info(message)
+
+
+def load_attempts_streaming(
+    api_client: "APIClient",
+    db_inserter: "DatabaseInserter",
+    start: str,
+    end: str,
+    batch_size: int,
+    keep_processed: bool = True,
+    on_processed: Optional[Callable[[Any], None]] = None,
+    report: Optional[RunReport] = None,
+) -> Tuple[int, int, List[Tuple]]:
+    """
+    Потоковая загрузка: каждая пачка из API сразу валидируется и вставляется в БД.
+    Транзакцию фиксирует вызывающий код. Если передан on_processed,
+    он вызывается для каждой обработанной пачки. Этапы замеряются в report.
+    Возвращает количество записей из API, количество обработанных записей
+    и список обработанных записей AttemptRecord (пустой при keep_processed=False).
+    """
+    report = report or RunReport()
+    api_records_cnt = 0
+    processed_records_cnt = 0
+    processed_attempts = []
+    # Одна сводка пропущенных записей на весь запуск, а не на каждую пачку
+    rejection_summary = DataProcessor.rejection_summary(report.rejections)
+
+    try:
+        for batch in report.iter_stage(
+            "api",
+            api_client.iter_attempts_data(
+                client=os.getenv("API_CLIENT"),
+                client_key=os.getenv("API_CLIENT_KEY"),
+                start=start,
+                end=end,
+                batch_size=batch_size,
+            ),
+        ):
+            batch_cnt = len(batch)
+            with report.stage("processing") as stage:
+                processed_batch = DataProcessor.processing_attempts(
+                    batch,
+                    start_index=api_records_cnt,
+                    release_raw=True,
+                    summary=rejection_summary,
+                )
+                stage["records"] = batch_cnt
+            with report.stage("db_insert") as stage:
+                insert_to_db(db_inserter, processed_batch, commit=False)
+                stage["records"] = len(processed_batch)
+            if on_processed:
+                with report.stage("post_processing"):
+                    on_processed(processed_batch)
+
+            api_records_cnt += batch_cnt
+            processed_records_cnt += len(processed_batch)
+            if keep_processed:
+                processed_attempts.extend(processed_batch)
+
+    finally:
+        rejection_summary.flush()
+
+    return api_records_cnt, processed_records_cnt, processed_attempts
+
+
+def load_attempts_pipelined(
+    api_client: "APIClient",
+    db_inserter: "DatabaseInserter",
+    start: str,
+    end: str,
+    batch_size: int,
+    queue_size: int,
+    commit_every: int = 1,
+    keep_processed: bool = True,
+    on_processed: Optional[Callable[[Any], None]] = None,
+    report: Optional[RunReport] = None,
+) -> Tuple[int, int, List[Tuple]]:
+    """
+    Конвейерная загрузка: получение, обработка и вставка работают одновременно
+    в разных потоках и связаны очередями размером queue_size пачек.
+    Транзакция фиксируется каждые commit_every пачек,
+    последнюю фиксацию выполняет вызывающий код.
+    Если передан on_processed, он вызывается для каждой обработанной пачки.
+    Этапы замеряются в report, у каждого этапа свой поток.
+    Возвращает количество записей из API, количество обработанных записей
+    и список обработанных записей AttemptRecord (пустой при keep_processed=False).
+    """
+    report = report or RunReport()
+    end_of_data = object()
+    raw_queue = queue.Queue(maxsize=queue_size)
+    processed_queue = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+    errors = []
+    # Одна сводка пропущенных записей на весь запуск, а не на каждую пачку
+    rejection_summary = DataProcessor.rejection_summary(report.rejections)
+
+    def put(target_queue: queue.Queue, item) -> bool:
+        # Не блокируемся навсегда, если другой этап упал
+        while not stop_event.is_set():
+            try:
+                target_queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(source_queue: queue.Queue):
+        while True:
+            try:
+                return source_queue.get(timeout=1)
+            except queue.Empty:
+                if stop_event.is_set():
+                    return end_of_data
+
+    def fetch() -> None:
+        try:
+            for batch in report.iter_stage(
+                "api",
+                api_client.iter_attempts_data(
+                    client=os.getenv("API_CLIENT"),
+                    client_key=os.getenv("API_CLIENT_KEY"),
+                    start=start,
+                    end=end,
+                    batch_size=batch_size,
+                ),
+            ):
+                if not put(raw_queue, batch):
+                    return
+        except Exception as err:
+            errors.append(err)
+            stop_event.set()
+        finally:
+            put(raw_queue, end_of_data)
+
+    def validate() -> None:
+        records_cnt = 0
+        try:
+            while (batch := get(raw_queue)) is not end_of_data:
+                batch_cnt = len(batch)
+                with report.stage("processing") as stage:
+                    processed_batch = DataProcessor.processing_attempts(
+                        batch,
+                        start_index=records_cnt,
+                        release_raw=True,
+                        summary=rejection_summary,
+                    )
+                    stage["records"] = batch_cnt
+                records_cnt += batch_cnt
+                if not put(processed_queue, (batch_cnt, processed_batch)):
+                    return
+        except Exception as err:
+            errors.append(err)
+            stop_event.set()
+        finally:
+            put(processed_queue, end_of_data)
+
+    workers = [
+        threading.Thread(target=fetch, name="pipeline-fetch", daemon=True),
+        threading.Thread(target=validate, name="pipeline-validate", daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
+    api_records_cnt = 0
+    processed_records_cnt = 0
+    processed_attempts = []
+    batches_cnt = 0
+
+    try:
+        while (item := get(processed_queue)) is not end_of_data:
+            records_cnt, processed_batch = item
+            with report.stage("db_insert") as stage:
+                insert_to_db(db_inserter, processed_batch, commit=False)
+                stage["records"] = len(processed_batch)
+            if on_processed:
+                with report.stage("post_processing"):
+                    on_processed(processed_batch)
+            api_records_cnt += records_cnt
+            processed_records_cnt += len(processed_batch)
+            if keep_processed:
+                processed_attempts.extend(processed_batch)
+
+            batches_cnt += 1
+            if batches_cnt % commit_every == 0:
+                with report.stage("db_insert"):
+                    db_inserter.commit()
+
+        if errors:
+            raise errors[0]
+
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join()
+        rejection_summary.flush()
+
+    logger.info(
+        f"Конвейерная загрузка завершена: {batches_cnt} пачек, {api_records_cnt} записей."
+    )
+    return api_records_cnt, processed_records_cnt, processed_attempts
+
+
+def load_attempts_batch(
+    api_client: "APIClient",
+    db_inserter: "DatabaseInserter",
+    start: str,
+    end: str,
+    on_processed: Optional[Callable[[Any], None]] = None,
+    report: Optional[RunReport] = None,
+) -> Tuple[int, int, List]:
+    """
+    Загрузка целиком: все данные из API получаются, обрабатываются и вставляются в БД.
+    Транзакцию фиксирует вызывающий код. Если передан on_processed,
+    он вызывается для обработанных записей. Этапы замеряются в report.
+    Возвращает количество записей из API, количество обработанных записей
+    и сами обработанные записи.
+    """
+    report = report or RunReport()
+
+    # Получение данных
+    with report.stage("api") as stage:
+        shard_hours = get_int_env("API_SHARD_HOURS")
+        if shard_hours > 0:
+            attempts_data = api_client.get_attempts_data_sharded(
+                client=os.getenv("API_CLIENT"),
+                client_key=os.getenv("API_CLIENT_KEY"),
+                start=start,
+                end=end,
+                shard_hours=shard_hours,
+                max_workers=get_int_env("API_MAX_WORKERS", 4),
+            )
+        else:
+            attempts_data = api_client.get_attempts_data(
+                client=os.getenv("API_CLIENT"),
+                client_key=os.getenv("API_CLIENT_KEY"),
+                start=start,
+                end=end,
+            )
+        api_records_cnt = stage["records"] = len(attempts_data)
+
+    if os.getenv("DATA_PROCESSOR_BACKEND") == "columnar":
+        # Колоночная обработка: DataFrame идет и в БД, и в статистику
+        with report.stage("processing") as stage:
+            processed_attempts, _ = DataProcessor.processing_attempts_columnar(
+                attempts_data, rejections=report.rejections, release_raw=True
+            )
+            stage["records"] = api_records_cnt
+        with report.stage("db_insert") as stage:
+            if os.getenv("DB_LOAD_MODE") == "copy":
+                db_inserter.copy_attempts_frame(processed_attempts, commit=False)
+            else:
+                db_inserter.insert_attempts_frame(processed_attempts, commit=False)
+            stage["records"] = len(processed_attempts)
+
+    else:
+        # Обработка данных
+        with report.stage("processing") as stage:
+            processing_workers = get_int_env("PROCESSING_WORKERS", 1)
+            if processing_workers > 1:
+                processed_attempts = DataProcessor.processing_attempts_parallel(
+                    attempts_data,
+                    workers=processing_workers,
+                    chunk_size=get_int_env("PROCESSING_CHUNK_SIZE", 20000),
+                    min_records=get_int_env("PROCESSING_MIN_RECORDS", 100000),
+                    rejections=report.rejections,
+                    release_raw=True,
+                )
+            else:
+                processed_attempts = DataProcessor.processing_attempts(
+                    attempts_data, rejections=report.rejections, release_raw=True
+                )
+            stage["records"] = api_records_cnt
+
+        # Вставка в БД
+        with report.stage("db_insert") as stage:
+            insert_to_db(db_inserter, processed_attempts, commit=False)
+            stage["records"] = len(processed_attempts)
+
+    if on_processed:
+        with report.stage("post_processing"):
+            on_processed(processed_attempts)
+
+    return api_records_cnt, len(processed_attempts), processed_attempts
+
+
+def load_attempts(
+    api_client: "APIClient",
+    db_inserter: "DatabaseInserter",
+    start: str,
+    end: str,
+    keep_processed: bool = True,
+    on_processed: Optional[Callable[[Any], None]] = None,
+    report: Optional[RunReport] = None,
+) -> Tuple[int, int, List]:
+    """
+    Загружает попытки за период способом, выбранным в переменных окружения.
+    Транзакцию фиксирует вызывающий код.
+    keep_processed=False позволяет потоковым режимам не держать данные в памяти.
+    on_processed вызывается для каждой обработанной пачки (скетчи, архив).
+    Этапы загрузки замеряются в report.
+    Возвращает количество записей из API, количество обработанных записей
+    и обработанные записи.
+    """
+    stream_batch_size = get_int_env("API_STREAM_BATCH_SIZE")
+    pipeline_queue_size = get_int_env("PIPELINE_QUEUE_SIZE")
+
+    if stream_batch_size > 0 and pipeline_queue_size > 0:
+        # Конвейерный режим: этапы работают одновременно, связаны очередями
+        return load_attempts_pipelined(
+            api_client,
+            db_inserter,
+            start,
+            end,
+            batch_size=stream_batch_size,
+            queue_size=pipeline_queue_size,
+            commit_every=get_int_env("DB_COMMIT_EVERY", 1),
+            keep_processed=keep_processed,
+            on_processed=on_processed,
+            report=report,
+        )
+
+    if stream_batch_size > 0:
+        # Потоковый режим: получение, обработка и вставка идут пачками
+        return load_attempts_streaming(
+            api_client,
+            db_inserter,
+            start,
+            end,
+            stream_batch_size,
+            keep_processed=keep_processed,
+            on_processed=on_processed,
+            report=report,
+        )
+
+    return load_attempts_batch(
+        api_client,
+        db_inserter,
+        start,
+        end,
+        on_processed=on_processed,
+        report=report,
+    )
+
+
+def run_post_load(
+    steps: Dict[str, Callable[[], Any]], report: RunReport, max_workers: int = 3
+) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Выполняет этапы после загрузки в БД одновременно, не больше max_workers сразу.
+    Каждый этап ограничен своим таймаутом из POST_LOAD_TIMEOUTS и замеряется
+    в report. Ошибка или зависание этапа не прерывает остальные этапы.
+    Этапы работают в фоновых (daemon) потоках: зависший этап не задерживает
+    ни письмо, ни завершение процесса.
+    Возвращает описания ошибок по названиям этапов и список этапов,
+    которые не завершились за отведенное время и еще могут работать.
+    """
+    errors = {}
+    if not steps:
+        return errors, []
+
+    step_errors: Dict[str, Exception] = {}
+    slots = threading.BoundedSemaphore(max_workers)
+
+    def run_step(name: str, step: Callable[[], Any]) -> None:
+        with slots:
+            try:
+                with report.stage(name):
+                    step()
+            except Exception as err:
+                step_errors[name] = err
+
+    started = time.monotonic()
+    threads = {
+        name: threading.Thread(
+            target=run_step, args=(name, step), name=f"post-{name}", daemon=True
+        )
+        for name, step in steps.items()
+    }
+    for thread in threads.values():
+        thread.start()
+
+    abandoned = []
+    for name, thread in threads.items():
+        timeout = get_int_env(
+            f"POST_LOAD_TIMEOUT_{name.upper()}", POST_LOAD_TIMEOUTS[name]
+        )
+        thread.join(timeout=max(0.0, started + timeout - time.monotonic()))
+        if thread.is_alive():
+            abandoned.append(name)
+            errors[name] = f"не завершен за {timeout} с"
+            logger.error(f"Этап {name} не завершен за {timeout} с.")
+        elif name in step_errors:
+            errors[name] = repr(step_errors[name])
+            logger.error(f"Ошибка на этапе {name}: {repr(step_errors[name])}")
+
+    return errors, abandoned
+
+
+def save_report(report: RunReport, status: str = "success", error: str = None):
+    """Сохраняет отчет о запуске. Ошибка сохранения не прерывает ETL-процесс."""
+    try:
+        report.save(status=status, error=error)
+    except OSError as err:
+        logger.error(f"Не удалось сохранить отчет о запуске: {repr(err)}")
+
+
 def main():
     """Главная функция ETL-процесса."""
     logger.info("Запуск ETL-процесса...")
 
     email_notifier = None
+    api_client = None
     db_inserter = None
+    abandoned_steps = []
+    report = RunReport()
 
     try:
         start_time = datetime.now()
@@ -60,52 +711,121 @@ def main():
         # Загрузка переменных окружения
         load_dotenv(find_dotenv())
 
-        # Получение данных
-        api_client = APIClient(url=os.getenv("API_URL"))
-        start, end = get_date_range()
-        attempts_data = api_client.get_attempts_data(
-            client=os.getenv("API_CLIENT"),
-            client_key=os.getenv("API_CLIENT_KEY"),
+        api_client = get_api_client()
+        db_inserter = get_db_inserter()
+        incremental = os.getenv("ETL_INCREMENTAL") == "1"
+
+        if incremental:
+            start, end = get_incremental_date_range(db_inserter)
+            if datetime.strptime(start, DATE_FORMAT) > datetime.strptime(
+                end, DATE_FORMAT
+            ):
+                logger.info("Водяной знак позже конца периода, загружать нечего.")
+                report.info.update(start=start, end=end)
+                save_report(report, status="skipped")
+                return
+        else:
+            start, end = get_date_range()
+
+        # Партиции создаются заранее, чтобы вставка не попала в партицию по умолчанию
+        db_inserter.ensure_partitions(start, end)
+
+        # Записи, которые уже есть в БД (повторный запуск, пересекающиеся периоды),
+        # отбрасываются до вставки
+        key_index = load_key_index(db_inserter, start, end, report)
+
+        # Статистику можно посчитать в БД, тогда данные не нужно держать в памяти.
+        # Строка даты в Google Sheets перезаписывается, поэтому при инкрементальной
+        # загрузке статистика всегда считается в БД за полные дни
+        stats_from_db = os.getenv("STATS_SOURCE") == "db" or incremental
+
+        # Дневные скетчи уникальных пользователей для DAU/WAU/MAU
+        user_sketches = {} if os.getenv("USER_SKETCHES") == "1" else None
+
+        # Архив обработанных записей в Parquet
+        archiver = get_parquet_archiver()
+        archived_days = set()
+
+        # Получение, обработка и вставка в БД
+        api_records_cnt, processed_records_cnt, processed_attempts = load_attempts(
+            api_client,
+            db_inserter,
+            start,
+            end,
+            keep_processed=not stats_from_db,
+            on_processed=get_processed_handler(user_sketches, archiver, archived_days),
+            report=report,
+        )
+        report.info.update(
             start=start,
             end=end,
+            api_records_cnt=api_records_cnt,
+            processed_records_cnt=processed_records_cnt,
         )
+        log_dedup_counts(key_index, report)
 
-        # Обработка данных
-        processed_attempts = DataProcessor.processing_attempts(attempts_data)
+        with report.stage("db_finalize"):
+            if user_sketches is not None:
+                db_inserter.merge_user_sketches(user_sketches, commit=False)
 
-        # Вставка в БД
-        db_inserter = DatabaseInserter(
-            host=os.getenv("DB_HOST"),
-            port=os.getenv("DB_PORT"),
-            database=os.getenv("DB_NAME"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-        )
-        db_inserter.insert_attempts(processed_attempts)
+            # Дневные витрины для дашборда обновляются в той же транзакции
+            db_inserter.refresh_daily_rollups(start, end, commit=False)
+
+            # Водяной знак сдвигается в одной транзакции с последней вставкой
+            if incremental:
+                db_inserter.set_watermark(
+                    datetime.strptime(end, DATE_FORMAT), commit=False
+                )
+            db_inserter.commit()
 
         # Отправка статистики в Google Sheets
-        credentials_json = base64.b64decode(
-            os.getenv("GOOGLE_SHEETS_CREDENTIALS_BASE64")
-        ).decode("utf-8")
-        sheets_reporter = GoogleSheetsReporter(
-            credentials_dict=json.loads(credentials_json),
-            spreadsheet_id=os.getenv("SPREADSHEET_ID"),
+        def send_stats() -> None:
+            sheets_reporter = get_sheets_reporter()
+            if stats_from_db:
+                stats_start = datetime.strptime(start, DATE_FORMAT).replace(
+                    hour=0, minute=0, second=0, microsecond=0
+                )
+                sheets_reporter.append_daily_stats(
+                    db_inserter.get_daily_stats(stats_start, end)
+                )
+            else:
+                sheets_reporter.append_stats(processed_attempts)
+
+        # Данные уже в БД: этапы ниже выполняются одновременно, и их ошибки
+        # попадают в письмо об успехе, а не превращают запуск в ошибку
+        post_load_steps = {"sheets": send_stats}
+        if user_sketches is not None:
+            post_load_steps["unique_users"] = lambda: log_unique_users(db_inserter, end)
+        # Потоковая загрузка пишет в архив по файлу на пачку, склеиваем их
+        if archiver is not None:
+            post_load_steps["archive"] = lambda: archiver.compact(sorted(archived_days))
+        failed_steps, abandoned_steps = run_post_load(
+            post_load_steps, report, max_workers=get_int_env("POST_LOAD_WORKERS", 3)
         )
-        sheets_reporter.append_stats(processed_attempts)
+        report.info["failed_steps"] = failed_steps
 
         # Отправка email об успехе
         email_notifier = get_email_notifier()
         sheets_url = f"https://docs.google.com/spreadsheets/d/{os.getenv('SPREADSHEET_ID')}/edit?usp=sharing"
         exec_time = datetime.now() - start_time
         email_notifier.send_success_report(
-            api_records_cnt=len(attempts_data),
-            processed_records_cnt=len(processed_attempts),
+            api_records_cnt=api_records_cnt,
+            processed_records_cnt=processed_records_cnt,
             sheets_url=sheets_url,
             dashboard_url=os.getenv("DASHBOARD_URL"),
             exec_time=exec_time,
+            stages_summary=report.format_stages(),
+            failed_steps=failed_steps,
         )
 
-        logger.info("ETL-процесс успешно завершен.")
+        if failed_steps:
+            logger.warning(
+                f"ETL-процесс завершен, не выполнены этапы: {', '.join(failed_steps)}."
+            )
+            save_report(report, status="partial")
+        else:
+            logger.info("ETL-процесс успешно завершен.")
+            save_report(report)
 
     except Exception as err:
         error_msg = f"Ошибка в ETL-процессе: {repr(err)}"
@@ -118,8 +838,19 @@ def main():
         except Exception as email_err:
             logger.error(f"Не удалось отправить email об ошибке: {repr(email_err)}")
 
+        save_report(report, status="error", error=error_msg)
+
     finally:
-        if db_inserter:
+        if api_client:
+            api_client.close()
+        if db_inserter and abandoned_steps:
+            # Зависший этап может еще брать соединение из пула:
+            # соединения закроются вместе с процессом
+            logger.warning(
+                f"Соединения с БД не закрываются, не завершены этапы: "
+                f"{', '.join(abandoned_steps)}."
+            )
+        elif db_inserter:
             try:
                 db_inserter.close_connection()
             except Exception as err: